@@ -4,57 +4,128 @@ from datetime import date, timedelta
 from dotenv import load_dotenv
 
 from db_utils import get_cities_grouped_by_county, get_cities_by_regions
-from services.open_meteo import get_open_meteo_daily
-from services.openweather import get_openweather_daily
+from services.fetch_engine import fetch_many
+from services.ow_quota import OpenWeatherQuotaError, priority_of
+from services.circuit_breaker import CircuitOpenError, breaker_states
 from aggregator import consensus
 from writer import (
-    make_slug, make_title, make_lead, make_article,
-    make_national_slug, make_national_title, make_national_article,
+    TEMPLATE_VERSION, LANGS,
+    make_slug, make_national_slug,
+    county_doc, national_doc, render_all,
 )
 from error_notifier import notify_error, wrap_with_notify
+import manifest
 
 load_dotenv()
 LANG  = os.getenv("DEFAULT_LANG", "hu")
 UNITS = os.getenv("DEFAULT_UNITS", "metric")
+# Cikknyelvek: a magyar .md/.txt marad az out/ gyökerében (ezt küldjük), a többi nyelv és minden
+# nyelv HTML-je az out/<nyelv>/ alá kerül – ugyanabból a dokumentumból, lekérés nélkül.
+ARTICLE_LANGS = ("hu",) + tuple(
+    l for l in dict.fromkeys(x.strip() for x in os.getenv("ARTICLE_LANGS", ",".join(LANGS)).split(","))
+    if l in LANGS and l != "hu"
+)
 
 OUTDIR = "out"
 os.makedirs(OUTDIR, exist_ok=True)
 
-def _safe_consensus(lat: float, lon: float) -> dict:
-    """Open-Meteo + OpenWeather konszenzus, OW hiba esetén riaszt + OM fallback."""
-    om = get_open_meteo_daily(lat, lon, lang=LANG)
-    try:
-        ow = get_openweather_daily(lat, lon, units=UNITS, lang=LANG)
-        return consensus(om, ow)
-    except Exception as e:
-        notify_error(e, context=f"build_articles._safe_consensus lat={lat}, lon={lon}")
-        # puha fallback: OM
-        return {"tmax_c": om["tmax"], "tmin_c": om["tmin"], "precip_mm": om["precip_mm"]}
+def _plan_fetch(cities_by_county: dict[str, list[dict]], regions: dict[str, list[dict]]) -> dict[tuple[float, float], dict]:
+    """
+    Lekérési terv: az országos, régiós és megyei nézet egyedi koordinátái.
+    Visszatérés: {(lat, lon): {"label": "megye / város", "priority": int, "population": int}},
+    érték szerint rendezve (megyeszékhely, majd lakosság) – az OW napi keret ebben a sorrendben fogy.
+    """
+    plan: dict[tuple[float, float], dict] = {}
+    for group, cities in list(cities_by_county.items()) + list(regions.items()):
+        for c in cities:
+            plan.setdefault((c["lat"], c["lon"]), {
+                "label": f"{group} / {c['city']}",
+                "priority": priority_of(c),
+                "population": c.get("population") or 0,
+            })
+    order = sorted(plan, key=lambda k: (-plan[k]["priority"], -plan[k]["population"]))
+    return {k: plan[k] for k in order}
+
+def _fetch_table(plan: dict[tuple[float, float], dict], target: date) -> dict[tuple[float, float], dict | None]:
+    """
+    Minden tervezett pontot pontosan egyszer kérdezünk le (OM + OW párhuzamosan → konszenzus).
+    Ha az OM is elbukik, a pont értéke None – a nézetek ezt maguk kezelik.
+    """
+    coords = list(plan)
+    results = fetch_many(coords, target=target, lang=LANG, units=UNITS,
+                         priorities=[plan[c]["priority"] for c in coords])
+    table: dict[tuple[float, float], dict | None] = {}
+    quota_skipped = 0
+    circuit_skipped = 0
+    for (lat, lon), res in zip(coords, results):
+        label = plan[(lat, lon)]["label"]
+        om, ow = res["om"], res["ow"]
+        if om is None:
+            if isinstance(res["om_error"], CircuitOpenError):
+                circuit_skipped += 1
+            else:
+                notify_error(res["om_error"], context="build_articles._fetch_table OM hiba", detail=label)
+            table[(lat, lon)] = None
+        elif ow is not None:
+            table[(lat, lon)] = consensus(om, ow)
+        else:
+            if isinstance(res["ow_error"], OpenWeatherQuotaError):
+                quota_skipped += 1
+            elif isinstance(res["ow_error"], CircuitOpenError):
+                circuit_skipped += 1
+            else:
+                notify_error(res["ow_error"], context="build_articles._fetch_table OW hiba", detail=label)
+            # puha fallback: OM
+            table[(lat, lon)] = {"tmax_c": om["tmax"], "tmin_c": om["tmin"], "precip_mm": om["precip_mm"]}
+    if quota_skipped:
+        notify_error(f"OW napi keret: {quota_skipped} pont csak Open-Meteo adatot kapott.", context="build_articles._fetch_table")
+    if circuit_skipped:
+        notify_error(f"Circuit breaker: {circuit_skipped} szolgáltatóhívás kimaradt. Állapot: {breaker_states()}",
+                     context="build_articles._fetch_table")
+    return table
 
 def _write(path: str, content: str):
     try:
         with open(path, "w", encoding="utf-8") as f:
             f.write(content)
     except Exception as e:
-        notify_error(e, context=f"build_articles._write path={path}")
+        notify_error(e, context="build_articles._write", detail=f"path={path}")
         raise
 
-@wrap_with_notify
-def build():
-    target = date.today() + timedelta(days=1)
-    print(f"== Cikkek generálása holnapra: {target.isoformat()} ==")
+# ===== Szakaszok =====
+# A pipeline (pipeline.py) ezeket külön futtatja és a kimenetüket JSON-ban menti; a build() egyben hívja őket.
 
+def fetch_stage(target: date) -> dict:
+    """Városok, régiók és az egyszeri lekérés eredménye. A pontok [lat, lon, konszenzus|None] listában (JSON-barát)."""
     # 1) Városok DB-ből (>=10k lakos; ÖSSZES város megyénként)
     cities_by_county = get_cities_grouped_by_county(limit_per_county=None, min_population=10000)
     # 2) Régiók
     regions = get_cities_by_regions(cities_by_county, per_county_cap=3)
+    # 3) Lekérési terv + egyszeri lekérés – mindhárom nézet ebből a táblából dolgozik
+    plan = _plan_fetch(cities_by_county, regions)
+    table = _fetch_table(plan, target)
+    print(f"ℹ️ {len(plan)} egyedi pont lekérve")
+    return {
+        "target": target.isoformat(),
+        "cities_by_county": cities_by_county,
+        "regions": regions,
+        "points": [[lat, lon, con] for (lat, lon), con in table.items()],
+    }
+
+def aggregate_stage(fetched: dict) -> dict:
+    """Országos, régiós és megyei átlagok a lekért pontokból."""
+    cities_by_county = fetched["cities_by_county"]
+    regions = fetched["regions"]
+    table = {(lat, lon): con for lat, lon, con in fetched["points"]}
 
     # ===== Országos blokk =====
     # Országos átlag a minden város konszenzusából (egyszerű átlag)
     country_rows = []
     for county, cities in cities_by_county.items():
         for c in cities:
-            con = _safe_consensus(c["lat"], c["lon"])
+            con = table.get((c["lat"], c["lon"]))
+            if con is None:
+                continue
             country_rows.append({"county": county, "city": c["city"], **con})
 
     if not country_rows:
@@ -68,17 +139,19 @@ def build():
     # régiók aggregálása
     region_rows = []
     for reg_name, reg_cities in regions.items():
-        if not reg_cities:
-            continue
         vals = []
         cities_preview = []
         for c in reg_cities:
-            con = _safe_consensus(c["lat"], c["lon"])
+            con = table.get((c["lat"], c["lon"]))
+            if con is None:
+                continue
             vals.append(con)
             cities_preview.append({
                 "city": c["city"],
                 "tmax": con["tmax_c"], "tmin": con["tmin_c"], "pr": con["precip_mm"]
             })
+        if not vals:
+            continue
         rtmax = sum(v["tmax_c"] for v in vals) / len(vals)
         rtmin = sum(v["tmin_c"] for v in vals) / len(vals)
         rpr   = max(v["precip_mm"] for v in vals)
@@ -86,34 +159,16 @@ def build():
             "tmax_c": rtmax, "tmin_c": rtmin, "precip_mm": rpr, "cities": cities_preview
         }))
 
-    nat_slug  = make_national_slug(target)
-    nat_title = make_national_title(target)
-    nat_body  = make_national_article(
-        target,
-        {"tmax_c": avg_tmax, "tmin_c": avg_tmin, "precip_mm": max_pr},
-        region_rows,
-        alerts=None  # ha lesz riasztásforrás, itt add át
-    )
-    _write(os.path.join(OUTDIR, f"{nat_slug}.md"), nat_body)
-    _write(os.path.join(OUTDIR, f"{nat_slug}.txt"), nat_title + "\n\n" + nat_body)
-
     # ===== Megyénként =====
+    county_rows = []
     for megye, cities in cities_by_county.items():
         per_city_rows = []
         agg_tmax, agg_tmin, agg_pr = [], [], []
 
         for c in cities:
-            try:
-                om = get_open_meteo_daily(c["lat"], c["lon"], lang=LANG)
-                try:
-                    ow = get_openweather_daily(c["lat"], c["lon"], units=UNITS, lang=LANG)
-                    con = consensus(om, ow)
-                except Exception as e:
-                    notify_error(e, context=f"OW hiba: {megye} / {c['city']}")
-                    con = {"tmax_c": om["tmax"], "tmin_c": om["tmin"], "precip_mm": om["precip_mm"]}
-            except Exception as e:
-                notify_error(e, context=f"OM hiba: {megye} / {c['city']}")
-                # ha OM is elbukik, eseti default (ne álljon le az egész megye)
+            con = table.get((c["lat"], c["lon"]))
+            if con is None:
+                # ha OM is elbukott, eseti default (ne álljon le az egész megye)
                 con = {"tmax_c": 0.0, "tmin_c": 0.0, "precip_mm": 0.0}
 
             per_city_rows.append({
@@ -126,23 +181,100 @@ def build():
             notify_error(f"Nincs város a megyében: {megye}", context="build_articles.build")
             continue
 
-        avg_tmax = sum(agg_tmax)/len(agg_tmax)
-        avg_tmin = sum(agg_tmin)/len(agg_tmin)
-        max_pr   = max(agg_pr)
+        county_rows.append({
+            "county": megye,
+            "cities": [c["city"] for c in cities],
+            "rows": per_city_rows,
+            "agg": {"tmax_c": sum(agg_tmax)/len(agg_tmax), "tmin_c": sum(agg_tmin)/len(agg_tmin), "precip_mm": max(agg_pr)},
+        })
 
-        slug  = make_slug(megye, target)
-        title = make_title(megye, target)
-        lead  = make_lead(avg_tmax, avg_tmin, max_pr, [c["city"] for c in cities])
-        body  = make_article(megye, per_city_rows, {"tmax_c": avg_tmax, "tmin_c": avg_tmin, "precip_mm": max_pr})
+    return {
+        "target": fetched["target"],
+        "national": {"tmax_c": avg_tmax, "tmin_c": avg_tmin, "precip_mm": max_pr},
+        "regions": region_rows,
+        "counties": county_rows,
+    }
+
+def _unchanged(prev: dict[str, dict], slug: str, h: str) -> dict | None:
+    """Az előző build manifest-bejegyzése, ha ugyanebből a bemenetből készült és a fájlok megvannak."""
+    e = prev.get(slug)
+    if not e or e.get("input_hash") != h:
+        return None
+    files = [e["md_file"], e["txt_file"]] + [f for v in (e.get("variants") or {}).values() for f in v.values()]
+    if not all(os.path.exists(os.path.join(OUTDIR, f)) for f in files):
+        return None
+    return {**e, "rendered": False}
+
+def _emit(kind: str, key: str, slug: str, doc: dict, h: str) -> dict:
+    """Egy dokumentum minden nyelve és formátuma egy renderelésből; visszatérés: manifest-bejegyzés."""
+    out = render_all(doc, ARTICLE_LANGS)
+    hu = out["hu"]
+    _write(os.path.join(OUTDIR, f"{slug}.md"), hu["md"])
+    # Telegram-barát sima TXT (a send_telegram a .txt-ket küldi)
+    _write(os.path.join(OUTDIR, f"{slug}.txt"), hu["txt"])
+    variants = {}
+    for lang, r in out.items():
+        os.makedirs(os.path.join(OUTDIR, lang), exist_ok=True)
+        files = {"html_file": f"{lang}/{slug}.html"}
+        if lang != "hu":
+            files.update(md_file=f"{lang}/{slug}.md", txt_file=f"{lang}/{slug}.txt")
+        for fmt, rel in files.items():
+            _write(os.path.join(OUTDIR, rel), r[fmt.split("_")[0]])
+        variants[lang] = files
+    return manifest.entry(kind, key, slug, hu["md"], hu["txt"], input_hash=h, variants=variants)
 
-        md = f"# {title}\n\n**Líd:** {lead}\n\n{body}\n"
-        _write(os.path.join(OUTDIR, f"{slug}.md"), md)
+def render_stage(agg: dict) -> dict:
+    """
+    Cikkek az out/ mappába (magyar .md + .txt, ARTICLE_LANGS szerint en/ru és HTML) és a kiküldési manifest.
+    Cikkenként a dokumentum (a már kerekített, megjelenő értékek) + TEMPLATE_VERSION + nyelvek hash-e
+    alapján: ha az előző build ugyanebből dolgozott, nem renderelünk és nem írunk – a manifestben
+    rendered=False. A nyers float-okat nem hash-eljük: a láthatatlan eltérés nem változás.
+    Hogy egy küldőnek mi új, azt a manifest.unpublished() dönti el (hash vs. utoljára kiküldött hash).
+    """
+    target = date.fromisoformat(agg["target"])
+    prev_doc = manifest.load(OUTDIR, target)
+    prev = {e["slug"]: e for e in prev_doc["messages"]} if prev_doc else {}
+    base = {"template": TEMPLATE_VERSION, "langs": ARTICLE_LANGS, "target": agg["target"]}
 
-        # Telegram-barát sima TXT: cím + üzenet (a send_telegram most a .txt-ket küldi)
-        txt = f"{title}\n\n{lead}\n\n{body}\n"
-        _write(os.path.join(OUTDIR, f"{slug}.txt"), txt)
+    nat_slug = make_national_slug(target)
+    doc = national_doc(
+        target,
+        agg["national"],
+        [tuple(r) for r in agg["regions"]],
+        alerts=None  # ha lesz riasztásforrás, itt add át
+    )
+    nat_hash = manifest.input_hash({**base, "doc": doc})
+    nat_entry = _unchanged(prev, nat_slug, nat_hash)
+    if nat_entry is None:
+        nat_entry = _emit("national", "Országos", nat_slug, doc, nat_hash)
+    else:
+        print("= Országos: változatlan, kimarad")
+    entries = [nat_entry]
 
-        print(f"✅ {megye}: out/{slug}.md + .txt")
+    for co in agg["counties"]:
+        megye = co["county"]
+        slug  = make_slug(megye, target)
+        doc = county_doc(megye, co["rows"], co["agg"], target=target)
+        h = manifest.input_hash({**base, "doc": doc})
+        old = _unchanged(prev, slug, h)
+        if old is not None:
+            entries.append(old)
+            print(f"= {megye}: változatlan, kimarad")
+            continue
+        entries.append(_emit("county", megye, slug, doc, h))
+        print(f"✅ {megye}: out/{slug}.md + .txt ({', '.join(ARTICLE_LANGS)})")
+
+    # Kiküldési manifest: a küldők ebből dolgoznak, nem az out/ szkenneléséből
+    path = manifest.write(OUTDIR, target, entries)
+    rendered = sum(1 for e in entries if e["rendered"])
+    print(f"🧾 Manifest: {path} ({len(entries)} üzenet, ebből {rendered} újrarenderelve)")
+    return {"target": agg["target"], "manifest": path, "messages": len(entries), "rendered": rendered}
+
+@wrap_with_notify
+def build():
+    target = date.today() + timedelta(days=1)
+    print(f"== Cikkek generálása holnapra: {target.isoformat()} ==")
+    render_stage(aggregate_stage(fetch_stage(target)))
 
 if __name__ == "__main__":
     build()
@@ -0,0 +1,164 @@
+# db_pool.py
+import os
+import time
+import asyncio
+import logging
+import weakref
+import threading
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import pool as pg_pool
+
+logger = logging.getLogger(__name__)
+
+# ---- Pool beállítások (ENV) ----
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+DB_POOL_ACQUIRE_TIMEOUT_S = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "10"))
+DB_POOL_HEALTHCHECK_IDLE_S = float(os.getenv("DB_POOL_HEALTHCHECK_IDLE", "30"))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "5000"))
+
+
+class ConnectionPool:
+    """
+    Szálbiztos psycopg2 pool:
+    - min/max méret; ha minden kapcsolat foglalt, a hívó vár (legfeljebb DB_POOL_ACQUIRE_TIMEOUT mp-ig),
+    - a régóta tétlen kapcsolatot kiadás előtt SELECT 1-gyel ellenőrizzük, a halottat eldobjuk,
+    - minden kapcsolaton statement_timeout.
+    """
+
+    def __init__(self, dsn: str, minconn: int = DB_POOL_MIN, maxconn: int = DB_POOL_MAX,
+                 statement_timeout_ms: int = DB_STATEMENT_TIMEOUT_MS):
+        self._pool = pg_pool.ThreadedConnectionPool(
+            minconn, maxconn, dsn,
+            options=f"-c statement_timeout={int(statement_timeout_ms)}",
+        )
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._last_used: dict[int, float] = {}
+
+    def _healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        last = self._last_used.get(id(conn))
+        if last is None or time.monotonic() - last < DB_POOL_HEALTHCHECK_IDLE_S:
+            # friss (most nyitott) vagy nemrég használt kapcsolat
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except Exception as e:
+            logger.warning("db_pool: halott kapcsolat eldobva: %s", e)
+            return False
+
+    def _checkout(self):
+        conn = self._pool.getconn()
+        if not self._healthy(conn):
+            self._last_used.pop(id(conn), None)
+            self._pool.putconn(conn, close=True)
+            conn = self._pool.getconn()
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Kapcsolat kölcsönzése; sikeres blokk után commit, hiba esetén rollback."""
+        if not self._slots.acquire(timeout=DB_POOL_ACQUIRE_TIMEOUT_S):
+            raise pg_pool.PoolError(f"db_pool: nincs szabad kapcsolat {DB_POOL_ACQUIRE_TIMEOUT_S} mp alatt")
+        conn = None
+        broken = False
+        try:
+            conn = self._checkout()
+            yield conn
+            conn.commit()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        except Exception:
+            if conn is not None and not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            if conn is not None:
+                if broken or conn.closed:
+                    self._last_used.pop(id(conn), None)
+                    self._pool.putconn(conn, close=True)
+                else:
+                    self._last_used[id(conn)] = time.monotonic()
+                    self._pool.putconn(conn)
+            self._slots.release()
+
+    def close(self) -> None:
+        self._pool.closeall()
+
+
+_pools: dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(dsn: str) -> ConnectionPool:
+    """Folyamatonként DSN-enként egy pool (lusta létrehozás)."""
+    with _pools_lock:
+        p = _pools.get(dsn)
+        if p is None:
+            p = ConnectionPool(dsn)
+            _pools[dsn] = p
+        return p
+
+
+# ---- async pool (bot): psycopg 3 + psycopg_pool, ugyanazokkal a beállításokkal ----
+
+_async_pools: dict[str, "AsyncConnectionPool"] = {}
+_async_pools_lock: asyncio.Lock | None = None
+# kapcsolat → utolsó visszaadás ideje; gyenge kulcs: a lezárt kapcsolat bejegyzése magától eltűnik,
+# és egy újrahasznosított id() sem örökli egy régi kapcsolat korát
+_returned_at: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+async def _mark_returned(conn) -> None:
+    _returned_at[conn] = time.monotonic()
+
+
+async def _check_async(conn) -> None:
+    """Csak a régóta tétlen kapcsolatot pingeljük (SELECT 1), a többi azonnal mehet."""
+    last = _returned_at.get(conn)
+    if last is not None and time.monotonic() - last < DB_POOL_HEALTHCHECK_IDLE_S:
+        return
+    async with conn.cursor() as cur:
+        await cur.execute("SELECT 1;")
+    await conn.rollback()
+
+
+async def get_async_pool(dsn: str):
+    """Folyamatonként DSN-enként egy megnyitott AsyncConnectionPool (lusta létrehozás)."""
+    global _async_pools_lock
+    p = _async_pools.get(dsn)
+    if p is not None:
+        return p
+    if _async_pools_lock is None:
+        _async_pools_lock = asyncio.Lock()
+    async with _async_pools_lock:
+        p = _async_pools.get(dsn)
+        if p is None:
+            from psycopg_pool import AsyncConnectionPool
+
+            p = AsyncConnectionPool(
+                dsn,
+                min_size=DB_POOL_MIN,
+                max_size=DB_POOL_MAX,
+                timeout=DB_POOL_ACQUIRE_TIMEOUT_S,
+                kwargs={"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"},
+                check=_check_async,
+                reset=_mark_returned,
+                open=False,
+            )
+            await p.open()
+            _async_pools[dsn] = p
+        return p
+
+
+async def close_async_pools() -> None:
+    while _async_pools:
+        _, p = _async_pools.popitem()
+        await p.close()
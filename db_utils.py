@@ -4,6 +4,7 @@ import psycopg2
 from psycopg2.extras import RealDictCursor
 from typing import Optional
 from error_notifier import notify_error
+import refdata
 
 # ---- DSN csak ENV-ből (DATABASE_URL). Ha hiányzik: Telegram + kivétel. ----
 def _dsn_from_env() -> str:
@@ -68,7 +69,8 @@ def get_cities_grouped_by_county(
             grouped[k] = grouped[k][:limit_per_county]
     return grouped
 
-# ---- Régiók és kiválogatásuk (marad a korábbi logika) ----
+# ---- Régiók és kiválogatásuk ----
+# Tartalék, ha a public.regions tábla nem elérhető vagy üres (a refdata pillanatképből olvassuk).
 REGIONS = {
     "Budapest és agglomeráció": ["Budapest", "Pest"],
     "Balaton": ["Veszprém", "Somogy", "Zala"],
@@ -77,6 +79,15 @@ REGIONS = {
     "Mecsek": ["Baranya"],
 }
 
+def _region_counties() -> dict:
+    """Régió → megyék: a public.regions táblából (refdata), különben a beépített REGIONS."""
+    try:
+        regions = refdata.get().regions.get("HU")
+    except Exception as e:
+        notify_error(e, context="db_utils._region_counties")
+        regions = None
+    return regions or REGIONS
+
 def get_cities_by_regions(all_by_county: dict[str, list[dict]], per_county_cap: int = 3) -> dict[str, list[dict]]:
     """
     Régiónként összegyűjti a városokat a megadott megyékből.
@@ -84,7 +95,7 @@ def get_cities_by_regions(all_by_county: dict[str, list[dict]], per_county_cap:
     """
     try:
         result: dict[str, list[dict]] = {}
-        for region_name, counties in REGIONS.items():
+        for region_name, counties in _region_counties().items():
             coll: list[dict] = []
             for co in counties:
                 cities = all_by_county.get(co, [])
@@ -1,10 +1,17 @@
 # error_notifier.py
 import os
-import requests
+import re
+import time
+import queue
+import atexit
+import threading
 import traceback
+from collections import OrderedDict
 from datetime import datetime
 from dotenv import load_dotenv
 
+from services import http_client
+
 load_dotenv()
 
 # A Telegram bot adatai
@@ -12,36 +19,143 @@ TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 # Ha nincs külön megadva, az általad kért fix ID-t használjuk (-3104033408)
 TELEGRAM_ALERT_CHAT_ID = os.getenv("TELEGRAM_ALERT_CHAT_ID", "-3104033408")
 
-def notify_error(error: str | Exception, context: str | None = None) -> None:
-    """
-    Hibajelentés küldése Telegramra.
-    Automatikusan formázza az üzenetet, és a stack trace-t is elküldi (ha van).
-    """
-    if not TELEGRAM_BOT_TOKEN or not TELEGRAM_ALERT_CHAT_ID:
-        print("⚠️ Nincs Telegram token vagy chat ID, nem tudok hibát küldeni.")
-        return
+# Háttérküldés: korlátos sor, ujjlenyomat szerinti csoportosítás, intervallumonként egy összesítő
+ALERT_FLUSH_INTERVAL_S = float(os.getenv("ALERT_FLUSH_INTERVAL", "30"))
+ALERT_QUEUE_MAX = int(os.getenv("ALERT_QUEUE_MAX", "1000"))
+_MSG_LIMIT = 4000
+_GROUP_LIMIT = 1500
 
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+_queue: queue.Queue = queue.Queue(maxsize=ALERT_QUEUE_MAX)
+_worker: threading.Thread | None = None
+_worker_lock = threading.Lock()
+_dropped = 0
+_dropped_lock = threading.Lock()
 
+def _format(error: str | Exception, context: str | None, detail: str | None = None) -> str:
+    extra = f"\n{detail}" if detail else ""
     # Stack trace hozzáadása (ha Exception objektum)
     if isinstance(error, Exception):
         trace = "".join(traceback.format_exception(type(error), error, error.__traceback__))
-        text = f"🟥 Hiba történt {context or ''}\n\n{error}\n\nTraceback:\n{trace}"
-    else:
-        text = f"🟥 Hiba: {error}\n\n{f'({context})' if context else ''}"
+        return f"🟥 Hiba történt {context or ''}{extra}\n\n{error}\n\nTraceback:\n{trace}"
+    return f"🟥 Hiba: {error}{extra}\n\n{f'({context})' if context else ''}"
 
-    # Biztonság: max 4000 karakter
-    text = text[:4000]
+def _fingerprint(error: str | Exception, context: str | None) -> str:
+    """Kivétel típusa + a kontextus sablonja (számok, koordináták nélkül) – a hasonló hibák egy csoportba esnek."""
+    def _template(s: str) -> str:
+        return re.sub(r"-?\d+(?:\.\d+)?", "#", s)
+    if isinstance(error, Exception):
+        return f"{type(error).__name__}|{_template(context or '')}"
+    return f"msg|{_template(str(error))}|{_template(context or '')}"
 
+def _post(text: str) -> None:
+    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
     try:
-        requests.post(url, data={
+        http_client.post(url, data={
             "chat_id": TELEGRAM_ALERT_CHAT_ID,
-            "text": text
+            "text": text[:_MSG_LIMIT]
         }, timeout=20)
         print(f"🚨 Hiba jelentve Telegramra ({datetime.now().strftime('%H:%M:%S')})")
     except Exception as e:
         print(f"⚠️ Nem sikerült elküldeni a hibát Telegramra: {e}")
 
+def _send_digest(groups: "OrderedDict[str, list]") -> None:
+    """Egy összesítő (szükség esetén több üzenetre darabolva): csoportonként az első példány + darabszám."""
+    global _dropped
+    with _dropped_lock:
+        dropped, _dropped = _dropped, 0
+    if not groups and not dropped:
+        return
+    total = sum(g[1] for g in groups.values())
+    blocks = []
+    for text, count in groups.values():
+        prefix = f"×{count} " if count > 1 else ""
+        blocks.append(prefix + text[:_GROUP_LIMIT])
+
+    # egyetlen, egyszeri hiba ugyanúgy néz ki, mint eddig (összesítő fejléc nélkül)
+    if total == 1 and not dropped:
+        _post(blocks[0])
+        return
+    header = f"🟥 Hibaösszesítő: {total} esemény, {len(groups)} fajta"
+    if dropped:
+        header += f" (+{dropped} eldobva, tele volt a sor)"
+    msg = header
+    for b in blocks:
+        if len(msg) + 2 + len(b) > _MSG_LIMIT:
+            _post(msg)
+            msg = b
+        else:
+            msg += "\n\n" + b
+    _post(msg)
+
+def _run() -> None:
+    groups: OrderedDict[str, list] = OrderedDict()
+    deadline = time.monotonic() + ALERT_FLUSH_INTERVAL_S
+    while True:
+        try:
+            kind, a, b = _queue.get(timeout=max(0.0, deadline - time.monotonic()))
+        except queue.Empty:
+            kind, a, b = "tick", None, None
+
+        if kind == "alert":
+            g = groups.setdefault(a, [b, 0])
+            g[1] += 1
+            continue
+        # tick / flush / stop: a gyűjtött csoportok kimennek
+        _send_digest(groups)
+        groups = OrderedDict()
+        deadline = time.monotonic() + ALERT_FLUSH_INTERVAL_S
+        if kind == "flush":
+            a.set()
+        elif kind == "stop":
+            a.set()
+            return
+
+def _ensure_worker() -> None:
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name="error-notifier", daemon=True)
+            _worker.start()
+
+def _control(kind: str, timeout: float) -> None:
+    if _worker is None or not _worker.is_alive():
+        return
+    done = threading.Event()
+    try:
+        _queue.put((kind, done, None), timeout=timeout)
+    except queue.Full:
+        return
+    done.wait(timeout)
+
+def flush(timeout: float = 30.0) -> None:
+    """A függő riasztások azonnali elküldése (blokkol, legfeljebb `timeout` mp-ig)."""
+    _control("flush", timeout)
+
+@atexit.register
+def _shutdown() -> None:
+    _control("stop", 30.0)
+
+def notify_error(error: str | Exception, context: str | None = None, detail: str | None = None) -> None:
+    """
+    Hibajelentés Telegramra – nem blokkol: a háttérszál intervallumonként egy összesítőt küld,
+    a hasonló hibákat (típus + kontextus-sablon) darabszámmal összevonva.
+    Automatikusan formázza az üzenetet, és a stack trace-t is elküldi (ha van).
+    A `detail` (pl. város, fájlnév) bekerül az üzenetbe, de a csoportosításba nem –
+    a kontextus legyen állandó, különben minden város külön csoport.
+    """
+    global _dropped
+    if not TELEGRAM_BOT_TOKEN or not TELEGRAM_ALERT_CHAT_ID:
+        print("⚠️ Nincs Telegram token vagy chat ID, nem tudok hibát küldeni.")
+        return
+
+    try:
+        _queue.put_nowait(("alert", _fingerprint(error, context), _format(error, context, detail)))
+    except queue.Full:
+        with _dropped_lock:
+            _dropped += 1
+        return
+    _ensure_worker()
+
 def wrap_with_notify(func):
     """
     Dekorátor – automatikusan értesít Telegramon, ha a függvény kivételt dob.
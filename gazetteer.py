@@ -0,0 +1,190 @@
+# gazetteer.py
+import os
+import asyncio
+import bisect
+import difflib
+import logging
+import unicodedata
+from array import array
+
+from db_pool import get_async_pool
+
+logger = logging.getLogger(__name__)
+
+GAZETTEER_REFRESH_S = float(os.getenv("GAZETTEER_REFRESH_S", "86400"))  # 0 = nincs frissítés
+GAZETTEER_FUZZY_CUTOFF = float(os.getenv("GAZETTEER_FUZZY_CUTOFF", "0.75"))
+
+# A rangsor ugyanaz, mint a korábbi bot-oldali ILIKE lekérdezésé:
+# magyar találat előnyben, majd megyeszékhely, aztán lakosság, végül név szerint.
+CITY_SQL = """
+SELECT
+  ci.name_hu AS city,
+  ci.slug    AS slug,
+  co.name_en AS country,
+  cn.name_hu AS county,
+  COALESCE(ci.lat, ST_Y(ci.geom))::float8 AS lat,
+  COALESCE(ci.lon, ST_X(ci.geom))::float8 AS lon,
+  co.iso2     AS iso2,
+  ci.is_county_seat::bool  AS is_county_seat,
+  NULLIF(ci.population, 0) AS population
+FROM public.cities ci
+JOIN public.countries co ON co.id = ci.country_id
+LEFT JOIN public.counties  cn ON cn.id = ci.county_id
+WHERE ci.name_hu IS NOT NULL
+ORDER BY
+  (co.iso2 = 'HU') DESC,
+  ci.is_county_seat DESC NULLS LAST,
+  COALESCE(ci.population, 0) DESC,
+  ci.name_hu;
+"""
+
+
+def fold(s: str | None) -> str:
+    """Ékezet nélküli, kisbetűs, egyszeres szóközös kulcs ("Hódmezővásárhely" → "hodmezovasarhely")."""
+    s = " ".join((s or "").split())
+    if not s.isascii():
+        s = "".join(ch for ch in unicodedata.normalize("NFKD", s) if not unicodedata.combining(ch))
+    return s.casefold()
+
+
+def _slugify(s: str) -> str:
+    return "-".join((s or "").lower().split())
+
+
+class Gazetteer:
+    """
+    Memóriában tartott településindex.
+    - a városok rangsor szerint vannak sorszámozva (0 = legjobb), oszloponként tömbökben tárolva,
+    - a kulcsok (név és slug, foldolva) rendezett listában, mellettük a városok sorszáma;
+      prefix-keresés bisect-tel, a találati tartományból a legkisebb sorszám nyer
+      (sparse table: tartomány-minimum O(1)-ben, nem a tartomány végigolvasásával).
+    """
+
+    def __init__(self, rows: list[dict]):
+        """`rows`: CITY_SQL sorai, már rangsor szerint rendezve. Koordináta nélküli sorokat kihagyjuk."""
+        countries: dict[tuple, int] = {}
+        counties: dict[str, int] = {}
+        self._names: list[str] = []
+        self._country = array("H")
+        self._county = array("i")
+        self._lat = array("d")
+        self._lon = array("d")
+        self._population = array("q")
+        self._seat = bytearray()
+        pairs: list[tuple[str, int]] = []
+
+        skipped = 0
+        for r in rows:
+            if r.get("lat") is None or r.get("lon") is None:
+                skipped += 1
+                continue
+            i = len(self._names)
+            ckey = (r.get("country"), r.get("iso2"))
+            self._names.append(r["city"])
+            self._country.append(countries.setdefault(ckey, len(countries)))
+            county = r.get("county")
+            self._county.append(-1 if county is None else counties.setdefault(county, len(counties)))
+            self._lat.append(float(r["lat"]))
+            self._lon.append(float(r["lon"]))
+            self._population.append(int(r.get("population") or 0))
+            self._seat.append(1 if r.get("is_county_seat") else 0)
+            keys = {fold(r["city"]), fold(r.get("slug"))}
+            pairs.extend((k, i) for k in keys if k)
+
+        self._countries = list(countries)
+        self._counties = list(counties)
+        pairs.sort()
+        self._keys = [k for k, _ in pairs]
+        self._idx = array("i", (i for _, i in pairs))
+        self._sparse = self._build_sparse(self._idx)
+        self._distinct_keys: list[str] | None = None
+        if skipped:
+            logger.warning("gazetteer: %d település kihagyva (nincs koordináta)", skipped)
+
+    @staticmethod
+    def _build_sparse(idx: array) -> list[array]:
+        """levels[j][i] = min(idx[i : i + 2**j]) – O(n log n) építés, a tartomány-minimum két olvasás."""
+        levels = [idx]
+        width = 1
+        while 2 * width <= len(idx):
+            prev = levels[-1]
+            levels.append(array("i", map(min, prev[:len(prev) - width], prev[width:])))
+            width *= 2
+        return levels
+
+    def _range_min(self, lo: int, hi: int) -> int | None:
+        if hi <= lo:
+            return None
+        j = (hi - lo).bit_length() - 1
+        level = self._sparse[j]
+        return min(level[lo], level[hi - (1 << j)])
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def _row(self, i: int) -> dict:
+        country, iso2 = self._countries[self._country[i]]
+        county = self._county[i]
+        return {
+            "city": self._names[i],
+            "country": country,
+            "county": None if county < 0 else self._counties[county],
+            "lat": self._lat[i],
+            "lon": self._lon[i],
+            "iso2": iso2,
+            "is_county_seat": bool(self._seat[i]),
+            "population": self._population[i] or None,
+        }
+
+    def _best_with_prefix(self, prefix: str) -> int | None:
+        if not prefix:
+            return None
+        lo = bisect.bisect_left(self._keys, prefix)
+        hi = bisect.bisect_left(self._keys, prefix + "\U0010ffff", lo)
+        return self._range_min(lo, hi)
+
+    def lookup(self, name: str) -> dict | None:
+        """A legjobb rangú település, amelynek neve vagy slugja a megadott előtaggal kezdődik."""
+        hits = [i for i in (self._best_with_prefix(fold(name)), self._best_with_prefix(fold(_slugify(name))))
+                if i is not None]
+        return self._row(min(hits)) if hits else None
+
+    def suggest(self, name: str, n: int = 3) -> list[dict]:
+        """Elgépelésre: a legközelebbi nevek (difflib), kulcsonként a legjobb rangú településsel."""
+        q = fold(name)
+        if not q:
+            return []
+        if self._distinct_keys is None:
+            self._distinct_keys = sorted(set(self._keys))
+        # azonos kezdőbetűs kulcsok közül keresünk – ez nagyságrenddel kevesebb összevetés
+        lo = bisect.bisect_left(self._distinct_keys, q[0])
+        hi = bisect.bisect_left(self._distinct_keys, q[0] + "\U0010ffff", lo)
+        cands = difflib.get_close_matches(q, self._distinct_keys[lo:hi], n=n, cutoff=GAZETTEER_FUZZY_CUTOFF)
+        out, seen = [], set()
+        for k in cands:
+            i = self._best_with_key(k)
+            if i is not None and i not in seen:
+                seen.add(i)
+                out.append(self._row(i))
+        return out
+
+    def _best_with_key(self, key: str) -> int | None:
+        lo = bisect.bisect_left(self._keys, key)
+        # a párok (kulcs, sorszám) szerint rendezettek: azonos kulcson belül az első a legjobb
+        return self._idx[lo] if lo < len(self._keys) and self._keys[lo] == key else None
+
+
+async def aload_from_db(dsn: str) -> Gazetteer:
+    """
+    Teljes betöltés egy lekérdezéssel a bot async poolján (induláskor és időzítve);
+    az index felépítése CPU-munka, az külön szálon fut, hogy ne fogja az event loopot.
+    """
+    from psycopg.rows import dict_row
+
+    pool = await get_async_pool(dsn)
+    async with pool.connection() as conn, conn.cursor(row_factory=dict_row) as cur:
+        await cur.execute(CITY_SQL)
+        rows = await cur.fetchall()
+    gaz = await asyncio.to_thread(Gazetteer, rows)
+    logger.info("gazetteer: %d település, %d kulcs betöltve", len(gaz), len(gaz._keys))
+    return gaz
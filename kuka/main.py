@@ -1,24 +1,31 @@
 # main.py
 import os
+import hmac
 from dotenv import load_dotenv
 
 from typing import Optional
-from fastapi import FastAPI, Query, HTTPException
+from fastapi import FastAPI, Query, HTTPException, Header
 import psycopg2
 import psycopg2.extras
 import argparse
 import uvicorn
 
 from cities import CITIES
-from services.open_meteo import get_open_meteo_daily
-from services.openweather import get_openweather_daily, OpenWeatherError
+from services.fetch_engine import fetch_pair, fetch_many
+from services.openweather import OpenWeatherError
+from services.http_client import host_stats
+from services.ow_quota import priority_of
+from services.circuit_breaker import breaker_states
 from aggregator import consensus
+import refdata
 
 # ==== ENV ====
 load_dotenv()
 LANG = os.getenv("DEFAULT_LANG", "hu")
 UNITS = os.getenv("DEFAULT_UNITS", "metric")
 DATABASE_URL = os.getenv("DATABASE_URL")  # pl. postgresql+psycopg2://user:pw@localhost:5432/ForeAIcast
+# A /refdata/reload csak ezzel a tokennel (X-Admin-Token fejléc) hívható; ha nincs megadva, a végpont nem létezik
+REFDATA_RELOAD_TOKEN = os.getenv("REFDATA_RELOAD_TOKEN")
 
 
 # ==== HELPERS ====
@@ -48,7 +55,7 @@ def fetch_city_by_slug(slug: str, iso2: str = "HU"):
         cur.execute(
             """
             SELECT ci.id, ci.name_hu, ci.slug, ci.lat, ci.lon,
-                   ci.is_capital, ci.is_county_seat,
+                   ci.is_capital, ci.is_county_seat, ci.population,
                    co.name_hu AS county_name
             FROM cities ci
             JOIN countries c  ON c.id = ci.country_id
@@ -66,24 +73,24 @@ def fetch_city_by_slug(slug: str, iso2: str = "HU"):
 def run_cli():
     print("== Holnapi előrejelzés – kettős forrás és konszenzus ==\n")
 
-    for c in CITIES:
-        name, lat, lon = c["name"], c["lat"], c["lon"]
+    # Open-Meteo + OpenWeather párhuzamosan, az összes városra egyszerre (sorrend = CITIES)
+    results = fetch_many([(c["lat"], c["lon"]) for c in CITIES], lang=LANG, units=UNITS)
+
+    for c, res in zip(CITIES, results):
+        name = c["name"]
 
         # 1) Open-Meteo – ez legyen az alap (stabil és ingyenes)
-        try:
-            om = get_open_meteo_daily(lat, lon, lang=LANG)
-        except Exception as e:
-            print(f"❌ {name}: Open-Meteo hiba: {e}\n")
+        om = res["om"]
+        if om is None:
+            print(f"❌ {name}: Open-Meteo hiba: {res['om_error']}\n")
             continue
 
         # 2) OpenWeather – opcionális
-        ow = None
-        try:
-            ow = get_openweather_daily(lat, lon, units=UNITS, lang=LANG)
-        except OpenWeatherError as e:
-            print(f"⚠️  {name}: OpenWeather kihagyva: {e}")
-        except Exception as e:
-            print(f"⚠️  {name}: OpenWeather váratlan hiba: {e}")
+        ow = res["ow"]
+        if isinstance(res["ow_error"], OpenWeatherError):
+            print(f"⚠️  {name}: OpenWeather kihagyva: {res['ow_error']}")
+        elif res["ow_error"] is not None:
+            print(f"⚠️  {name}: OpenWeather váratlan hiba: {res['ow_error']}")
 
         # 3) Kiírás
         date_str = om["date"]
@@ -127,38 +134,51 @@ app = FastAPI(title="ForeAIcast API")
 
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    breakers = breaker_states()
+    degraded = any(b["state"] != "closed" for b in breakers.values())
+    return {"status": "degraded" if degraded else "ok", "breakers": breakers, "http": host_stats()}
+
+
+@app.post("/refdata/reload", include_in_schema=False)
+def reload_refdata(x_admin_token: Optional[str] = Header(default=None)):
+    """
+    Ország/megye/régió pillanatkép újratöltése (pl. seed-frissítés után).
+    Admin végpont: REFDATA_RELOAD_TOKEN nélkül 404, rossz/hiányzó X-Admin-Token fejléccel 403.
+    """
+    if not REFDATA_RELOAD_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, REFDATA_RELOAD_TOKEN):
+        raise HTTPException(status_code=403, detail="Forbidden")
+    ref = refdata.reload()
+    return {"countries": len(ref.countries), "counties": sum(len(v) for v in ref.counties.values())}
+
+
+def _country_id(iso2: str) -> int | None:
+    country = refdata.get().country(iso2)
+    return country["id"] if country else None
 
 
 @app.get("/countries/{iso2}/counties")
 def list_counties(iso2: str):
-    with get_conn() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-        cur.execute(
-            """
-            SELECT co.id, co.name_hu, co.slug
-            FROM counties co
-            JOIN countries c ON c.id = co.country_id
-            WHERE c.iso2 = %s
-            ORDER BY co.name_hu;
-            """,
-            (iso2.upper(),),
-        )
-        return {"items": cur.fetchall()}
+    return {"items": [dict(c) for c in refdata.get().counties.get(iso2.upper(), ())]}
 
 
 @app.get("/countries/{iso2}/search")
 def search_city(iso2: str, q: str = Query(..., min_length=1)):
+    country_id = _country_id(iso2)
+    if country_id is None:
+        return {"items": []}
     with get_conn() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
         cur.execute(
             """
             SELECT id, name_hu, slug, county_name, lat, lon, is_capital, is_county_seat
             FROM search_city
-            WHERE country_id = (SELECT id FROM countries WHERE iso2=%s)
+            WHERE country_id = %s
               AND q ILIKE unaccent(lower('%%'||%s||'%%'))
             ORDER BY is_capital DESC, is_county_seat DESC, rank ASC
             LIMIT 20;
             """,
-            (iso2.upper(), q),
+            (country_id, q),
         )
         return {"items": cur.fetchall()}
 
@@ -169,18 +189,20 @@ def list_cities_in_county(
     county: str = Query(..., description="Megye slug (pl. 'pest', 'csongrad-csanad')"),
     limit: int = Query(200, ge=1, le=1000),
 ):
+    country_id = _country_id(iso2)
+    co = refdata.get().county_by_slug(iso2, county)
+    if country_id is None or not co:
+        return {"items": []}
     with get_conn() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
         cur.execute(
             """
             SELECT ci.id, ci.name_hu, ci.slug, ci.lat, ci.lon, ci.is_capital, ci.is_county_seat
             FROM cities ci
-            JOIN counties co  ON co.id = ci.county_id
-            JOIN countries c  ON c.id = ci.country_id
-            WHERE c.iso2 = %s AND co.slug = %s
+            WHERE ci.country_id = %s AND ci.county_id = %s
             ORDER BY ci.is_county_seat DESC, ci.rank ASC, ci.name_hu
             LIMIT %s;
             """,
-            (iso2.upper(), county, limit),
+            (country_id, co["id"], limit),
         )
         return {"items": cur.fetchall()}
 
@@ -195,20 +217,12 @@ def forecast_by_coords(
     lang = (lang or LANG)
     units = (units or UNITS)
 
-    # Open-Meteo
-    try:
-        om = get_open_meteo_daily(lat, lon, lang=lang)
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Open-Meteo error: {e}")
-
-    # OpenWeather (opcionális)
-    ow = None
-    try:
-        ow = get_openweather_daily(lat, lon, units=units, lang=lang)
-    except OpenWeatherError as e:
-        ow = None  # kulcs hiány vagy kvóta: nem fatal
-    except Exception as e:
-        ow = None
+    # Open-Meteo + OpenWeather (opcionális) párhuzamosan
+    res = fetch_pair(lat, lon, lang=lang, units=units)
+    om = res["om"]
+    if om is None:
+        raise HTTPException(status_code=502, detail=f"Open-Meteo error: {res['om_error']}")
+    ow = res["ow"]  # kulcs hiány vagy kvóta: nem fatal
 
     if ow:
         con = consensus(om, ow)
@@ -238,20 +252,12 @@ def forecast_by_slug(slug: str, iso2: str = "HU", lang: Optional[str] = None, un
     lang = (lang or LANG)
     units = (units or UNITS)
 
-    # Open-Meteo
-    try:
-        om = get_open_meteo_daily(lat, lon, lang=lang)
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Open-Meteo error: {e}")
-
-    # OpenWeather (opcionális)
-    ow = None
-    try:
-        ow = get_openweather_daily(lat, lon, units=units, lang=lang)
-    except OpenWeatherError:
-        ow = None
-    except Exception:
-        ow = None
+    # Open-Meteo + OpenWeather (opcionális) párhuzamosan
+    res = fetch_pair(lat, lon, lang=lang, units=units, priority=priority_of(city))
+    om = res["om"]
+    if om is None:
+        raise HTTPException(status_code=502, detail=f"Open-Meteo error: {res['om_error']}")
+    ow = res["ow"]  # kulcs hiány vagy kvóta: nem fatal
 
     if ow:
         con = consensus(om, ow)
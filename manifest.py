@@ -0,0 +1,155 @@
+# manifest.py
+import os
+import json
+import fcntl
+import hashlib
+from datetime import date, datetime, timezone
+
+# A build egy dátumhoz egyetlen manifestet ír az out/ mappába: a kiküldendő üzenetek sorrendben,
+# előre darabolva. A küldők (send_telegram, run_daily) ezt töltik be egyszer, nem szkennelik az out/-ot.
+# Hogy mi "változott", azt nem az előző buildhez, hanem a küldőnként utoljára kiküldött változathoz
+# mérjük (published-<dátum>.json): egy újrafuttatott render így nem nyeli el a még ki nem küldött frissítést.
+MANIFEST_VERSION = 2
+TG_CHUNK = 4090       # Telegram 4096-os limit, pár karakter tartalékkal
+DAILY_CHUNK = 3500    # run_daily: a korábbi, óvatosabb darabolás
+
+
+def manifest_path(outdir: str, target: date | str) -> str:
+    d = target.isoformat() if isinstance(target, date) else target
+    return os.path.join(outdir, f"manifest-{d}.json")
+
+
+def _latest_path(outdir: str) -> str:
+    return os.path.join(outdir, "manifest-latest.json")
+
+
+def split_chunks(text: str, limit: int) -> list[str]:
+    """Darabolás `limit` hosszra, lehetőleg bekezdés-, majd sorhatáron."""
+    text = text.strip()
+    parts = []
+    while len(text) > limit:
+        cut = text.rfind("\n\n", 0, limit)
+        if cut <= 0:
+            cut = text.rfind("\n", 0, limit)
+        if cut <= 0:
+            cut = limit
+        parts.append(text[:cut].rstrip())
+        text = text[cut:].lstrip()
+    if text or not parts:
+        parts.append(text)
+    return parts
+
+
+def input_hash(payload) -> str:
+    """Normalizált (rendezett kulcsú, tömör) JSON sha256-ja – a render bemenetének ujjlenyomata."""
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def entry(kind: str, key: str, slug: str, md: str, txt: str, input_hash: str | None = None,
+          variants: dict[str, dict[str, str]] | None = None) -> dict:
+    """
+    Egy üzenet leírása (`kind`: "national" | "county"; `key`: megye neve vagy "Országos").
+    `variants`: nyelvenként a további kimenetek (out/-hoz relatív útvonalak, pl. {"en": {"md_file": ...}}).
+    """
+    return {
+        "kind": kind,
+        "key": key,
+        "slug": slug,
+        "md_file": f"{slug}.md",
+        "txt_file": f"{slug}.txt",
+        "sha256": hashlib.sha256(txt.encode("utf-8")).hexdigest(),
+        "tg_chunks": split_chunks(txt, TG_CHUNK),
+        "md_chunks": split_chunks(md, DAILY_CHUNK),
+        "input_hash": input_hash,
+        "variants": variants or {},
+        "rendered": True,  # ebben a buildben íródott-e újra (False: az előző build fájljai maradtak)
+    }
+
+
+def write(outdir: str, target: date, entries: list[dict]) -> str:
+    """
+    Manifest kiírása (országos elöl, utána a megyék slug szerint) + a "legutóbbi" mutató frissítése.
+    A küldők --changed-only módja nem ebből, hanem az unpublished()-ből dolgozik.
+    """
+    ordered = sorted(entries, key=lambda e: (e["kind"] != "national", e["slug"]))
+    doc = {
+        "version": MANIFEST_VERSION,
+        "date": target.isoformat(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "messages": ordered,
+    }
+    path = manifest_path(outdir, target)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(doc, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+    with open(_latest_path(outdir) + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"date": doc["date"]}, f)
+    os.replace(_latest_path(outdir) + ".tmp", _latest_path(outdir))
+    return path
+
+
+def load(outdir: str, target: date | str | None = None) -> dict | None:
+    """Az adott (vagy a legutóbb épített) nap manifestje; ha nincs, None."""
+    try:
+        if target is None:
+            with open(_latest_path(outdir), encoding="utf-8") as f:
+                target = json.load(f)["date"]
+        with open(manifest_path(outdir, target), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+# ---- Kiküldési állapot: küldőnként (pl. "channel", "telegram") slug → utoljára kiküldött input_hash ----
+
+def published_path(outdir: str, target: date | str) -> str:
+    d = target.isoformat() if isinstance(target, date) else target
+    return os.path.join(outdir, f"published-{d}.json")
+
+
+def _update_published(outdir: str, target: date | str, fn):
+    """Fájlzáras olvasás-módosítás-írás: a párhuzamos shardok egymás bejegyzéseit nem írják felül."""
+    os.makedirs(outdir, exist_ok=True)
+    with open(published_path(outdir, target), "a+", encoding="utf-8") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            f.seek(0)
+            raw = f.read()
+            try:
+                state = json.loads(raw) if raw.strip() else {}
+            except ValueError:
+                state = {}
+            result = fn(state)
+            f.seek(0)
+            f.truncate()
+            json.dump(state, f, ensure_ascii=False, indent=1)
+            f.flush()  # a zár feloldása előtt kerüljön a fájlba
+            return result
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def load_published(outdir: str, target: date | str, publisher: str) -> dict[str, str]:
+    """Az adott küldő által a napra már kiküldött változatok: slug → input_hash."""
+    try:
+        with open(published_path(outdir, target), encoding="utf-8") as f:
+            return dict(json.load(f).get(publisher) or {})
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
+def mark_published(outdir: str, target: date | str, publisher: str, messages: list[dict]) -> None:
+    """A kiküldött manifest-bejegyzések input_hash-ének rögzítése a küldő nevén."""
+    def _mark(state: dict) -> None:
+        sent = state.setdefault(publisher, {})
+        for m in messages:
+            sent[m["slug"]] = m.get("input_hash")
+    _update_published(outdir, target, _mark)
+
+
+def unpublished(doc: dict, published: dict[str, str]) -> list[dict]:
+    """Azok az üzenetek, amelyeknek ezt a változatát a küldő még nem küldte ki (hash nélkül: mindig)."""
+    return [m for m in doc["messages"]
+            if m.get("input_hash") is None or published.get(m["slug"]) != m["input_hash"]]
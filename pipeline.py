@@ -0,0 +1,170 @@
+# pipeline.py
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import date, datetime, timedelta, timezone
+
+from dotenv import load_dotenv
+load_dotenv()
+
+import build_articles
+import run_daily
+from error_notifier import notify_error
+
+# Napi futás szakaszokra bontva: fetch → aggregate → render → publish.
+# Minden szakasz a kimenetét out/pipeline/<dátum>/<szakasz>.json-ba menti, az állapotot és a
+# futásidőt a state.json-ba. Ha a kiküldés hajnalban elhasal, nem kell újra lekérdezni a szolgáltatókat:
+#   python pipeline.py --only-failed         # az első nem sikeres szakasztól folytat
+#   python pipeline.py --from-stage render   # a fetch/aggregate mentett kimenetéből újrarenderel
+STAGES = ("fetch", "aggregate", "render", "publish")
+
+
+def stage_dir(target: str) -> str:
+    return os.path.join(build_articles.OUTDIR, "pipeline", target)
+
+
+def _dump(path: str, obj) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _read(path: str):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class Run:
+    """Egy dátum futásának állapota (state.json) és a szakaszkimenetek."""
+
+    def __init__(self, target: str):
+        self.target = target
+        self.dir = stage_dir(target)
+        os.makedirs(self.dir, exist_ok=True)
+        self.state = _read(self._state_path()) or {"date": target, "stages": {}}
+
+    def _state_path(self) -> str:
+        return os.path.join(self.dir, "state.json")
+
+    def _output_path(self, stage: str) -> str:
+        return os.path.join(self.dir, f"{stage}.json")
+
+    def status(self, stage: str) -> str:
+        return self.state["stages"].get(stage, {}).get("status", "pending")
+
+    def mark(self, stage: str, status: str, seconds: float | None = None, error: str | None = None) -> None:
+        self.state["stages"][stage] = {
+            "status": status,
+            "seconds": None if seconds is None else round(seconds, 3),
+            "finished_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "error": error,
+        }
+        _dump(self._state_path(), self.state)
+
+    def output(self, stage: str):
+        return _read(self._output_path(stage))
+
+    def save_output(self, stage: str, data) -> None:
+        _dump(self._output_path(stage), data)
+
+
+def _fetch(run: Run, fresh: bool):
+    return build_articles.fetch_stage(date.fromisoformat(run.target))
+
+
+def _aggregate(run: Run, fresh: bool):
+    return build_articles.aggregate_stage(_require(run, "fetch"))
+
+
+def _render(run: Run, fresh: bool):
+    return build_articles.render_stage(_require(run, "aggregate"))
+
+
+def _publish(run: Run, fresh: bool):
+    _require(run, "render")
+    # folytatásnál az előző próbálkozás már kiküldött üzeneteit nem küldjük újra
+    prev = None if fresh else run.output("publish")
+    start = prev["sent"] if prev else 0
+    if start:
+        print(f"↩️ Kiküldés folytatása a(z) {start + 1}. üzenettől")
+    total = run_daily.publish(run.target, start=start,
+                              on_sent=lambda n: run.save_output("publish", {"sent": n}))
+    return {"sent": total}
+
+
+_RUNNERS = {"fetch": _fetch, "aggregate": _aggregate, "render": _render, "publish": _publish}
+
+
+def _require(run: Run, stage: str):
+    data = run.output(stage)
+    if data is None:
+        raise RuntimeError(f"Hiányzik a(z) '{stage}' szakasz mentett kimenete ({run.dir}) – futtasd onnan.")
+    return data
+
+
+def run(target: str, from_stage: str | None = None, only_failed: bool = False) -> int:
+    """Szakaszok futtatása; visszatérés: kilépési kód (0 = minden szakasz sikeres)."""
+    r = Run(target)
+    if only_failed:
+        first = next((i for i, s in enumerate(STAGES) if r.status(s) != "ok"), len(STAGES))
+        if first == len(STAGES):
+            print(f"ℹ️ {target}: minden szakasz sikeres volt, nincs mit újrafuttatni.")
+            return 0
+    else:
+        first = STAGES.index(from_stage) if from_stage else 0
+
+    print(f"== Pipeline {target}: {' → '.join(STAGES[first:])} ==")
+    for stage in STAGES[first:]:
+        # --only-failed: a félbemaradt szakasz a mentett részeredményből folytat; különben elölről
+        fresh = not (only_failed and r.status(stage) in ("failed", "running"))
+        if fresh and stage == "publish":
+            r.save_output("publish", {"sent": 0})
+        r.mark(stage, "running")
+        started = time.monotonic()
+        try:
+            out = _RUNNERS[stage](r, fresh)
+        except Exception as e:
+            took = time.monotonic() - started
+            r.mark(stage, "failed", took, error=f"{type(e).__name__}: {e}")
+            notify_error(e, context=f"pipeline.{stage} ({target})")
+            print(f"❌ {stage} hiba ({took:.1f} mp): {e}")
+            _print_timings(r)
+            return 1
+        took = time.monotonic() - started
+        r.save_output(stage, out)
+        r.mark(stage, "ok", took)
+        print(f"⏱️ {stage}: {took:.1f} mp")
+    _print_timings(r)
+    return 0
+
+
+def _print_timings(r: Run) -> None:
+    parts = []
+    for s in STAGES:
+        st = r.state["stages"].get(s, {})
+        secs = st.get("seconds")
+        parts.append(f"{s}={r.status(s)}" + (f" ({secs:.1f} mp)" if secs is not None else ""))
+    print("📊 " + ", ".join(parts))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Napi build + kiküldés szakaszonként")
+    ap.add_argument("--date", default=(date.today() + timedelta(days=1)).isoformat(),
+                    help="Céldátum (YYYY-MM-DD), alapból holnap")
+    g = ap.add_mutually_exclusive_group()
+    g.add_argument("--from-stage", choices=STAGES, default=None,
+                   help="Ettől a szakasztól fut; a korábbiak mentett kimenetét használja")
+    g.add_argument("--only-failed", action="store_true",
+                   help="Az első nem sikeres szakasztól folytat (a félbemaradt kiküldést onnan, ahol elakadt)")
+    args = ap.parse_args()
+    sys.exit(run(args.date, from_stage=args.from_stage, only_failed=args.only_failed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# refdata.py
+import os
+import logging
+import threading
+from types import MappingProxyType
+
+from psycopg2.extras import RealDictCursor
+
+from db_pool import get_pool, get_async_pool
+
+logger = logging.getLogger(__name__)
+
+# Országok / megyék / régiók: évente néhányszor változnak, naponta ezerszer kérdezzük.
+# Induláskor egyszer betöltjük, utána csak a reload() cseréli le a pillanatképet.
+REFDATA_REFRESH_S = float(os.getenv("REFDATA_REFRESH_S", "86400"))  # 0 = nincs időzített frissítés
+
+
+class RefData:
+    """
+    Megváltoztathatatlan pillanatkép:
+    - countries: iso2 → {id, iso2, name_en, default_lang}
+    - counties:  iso2 → ({id, name_hu, slug}, ...) név szerint
+    - regions:   iso2 → {régiónév: (megye, ...)} id szerinti sorrendben
+    """
+
+    __slots__ = ("countries", "counties", "regions")
+
+    def __init__(self, countries: list[dict], counties: list[dict], regions: list[dict]):
+        by_id = {c["id"]: c["iso2"] for c in countries}
+        self.countries = MappingProxyType({
+            c["iso2"]: MappingProxyType(dict(c)) for c in countries
+        })
+
+        co: dict[str, list] = {}
+        for r in counties:
+            co.setdefault(by_id.get(r["country_id"]), []).append(
+                MappingProxyType({"id": r["id"], "name_hu": r["name_hu"], "slug": r["slug"]})
+            )
+        self.counties = MappingProxyType({k: tuple(v) for k, v in co.items() if k})
+
+        rg: dict[str, dict] = {}
+        for r in regions:
+            rg.setdefault(by_id.get(r["country_id"]), {})[r["name_hu"]] = tuple(r["counties"] or ())
+        self.regions = MappingProxyType({k: MappingProxyType(v) for k, v in rg.items() if k})
+
+    def country(self, iso2: str | None):
+        return self.countries.get((iso2 or "").upper())
+
+    def default_lang(self, iso2: str | None) -> str | None:
+        c = self.country(iso2)
+        return c.get("default_lang") if c else None
+
+    def county_by_slug(self, iso2: str, slug: str):
+        for c in self.counties.get(iso2.upper(), ()):
+            if c["slug"] == slug:
+                return c
+        return None
+
+
+def _dsn() -> str:
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        raise RuntimeError("DATABASE_URL environment variable is required")
+    return url.replace("+psycopg2", "")
+
+
+COUNTRIES_SQL = "SELECT id, iso2, name_en, default_lang FROM public.countries ORDER BY iso2;"
+COUNTIES_SQL = "SELECT id, country_id, name_hu, slug FROM public.counties ORDER BY name_hu;"
+HAS_REGIONS_SQL = "SELECT to_regclass('public.regions') IS NOT NULL AS ok;"
+REGIONS_SQL = "SELECT country_id, name_hu, counties FROM public.regions ORDER BY id;"
+
+
+def _snapshot_from(countries: list[dict], counties: list[dict], regions: list[dict]) -> RefData:
+    snap = RefData(countries, counties, regions)
+    logger.info("refdata: %d ország, %d megye, %d régió betöltve", len(countries), len(counties), len(regions))
+    return snap
+
+
+def _load() -> RefData:
+    """Szinkron betöltés (API, build) a psycopg2 poolon."""
+    with get_pool(_dsn()).connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(COUNTRIES_SQL)
+        countries = cur.fetchall()
+        cur.execute(COUNTIES_SQL)
+        counties = cur.fetchall()
+        cur.execute(HAS_REGIONS_SQL)
+        regions = []
+        if cur.fetchone()["ok"]:
+            cur.execute(REGIONS_SQL)
+            regions = cur.fetchall()
+    return _snapshot_from(countries, counties, regions)
+
+
+async def _aload() -> RefData:
+    """Async betöltés a bot saját psycopg 3 poolján (a botban nincs psycopg2 pool)."""
+    from psycopg.rows import dict_row
+
+    pool = await get_async_pool(_dsn())
+    async with pool.connection() as conn, conn.cursor(row_factory=dict_row) as cur:
+        await cur.execute(COUNTRIES_SQL)
+        countries = await cur.fetchall()
+        await cur.execute(COUNTIES_SQL)
+        counties = await cur.fetchall()
+        await cur.execute(HAS_REGIONS_SQL)
+        regions = []
+        if (await cur.fetchone())["ok"]:
+            await cur.execute(REGIONS_SQL)
+            regions = await cur.fetchall()
+    return _snapshot_from(countries, counties, regions)
+
+
+_snapshot: RefData | None = None
+_lock = threading.Lock()
+
+
+def current() -> RefData | None:
+    """A betöltött pillanatkép, betöltés nélkül (event loopból ezt használjuk)."""
+    return _snapshot
+
+
+def get() -> RefData:
+    """Az aktuális pillanatkép (első híváskor betölti)."""
+    snap = _snapshot
+    if snap is None:
+        with _lock:
+            if _snapshot is None:
+                reload()
+            snap = _snapshot
+    return snap
+
+
+def reload() -> RefData:
+    """Újratöltés a DB-ből; hiba esetén a régi pillanatkép marad és a kivétel továbbmegy."""
+    global _snapshot
+    snap = _load()
+    _snapshot = snap
+    return snap
+
+
+async def areload() -> RefData:
+    """A reload() async párja a bothoz; ugyanúgy: hiba esetén a régi pillanatkép marad."""
+    global _snapshot
+    snap = await _aload()
+    _snapshot = snap
+    return snap
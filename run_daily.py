@@ -1,17 +1,25 @@
 # run_daily.py
-import os, glob, time
+import os, time
 from datetime import date, timedelta
+from typing import Callable
 from dotenv import load_dotenv
-import requests
 
 import build_articles  # a korábban létrehozott generátor
+from services import http_client
+import manifest
 
 load_dotenv()
 TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
-assert TOKEN and CHAT_ID, "Hiányzik TELEGRAM_BOT_TOKEN vagy TELEGRAM_CHAT_ID a .env-ben"
 
 API_URL = f"https://api.telegram.org/bot{TOKEN}/sendMessage"
+# a manifest.mark_published() küldőneve: a csatornára csak a még ki nem küldött változatok mennek
+PUBLISHER = "channel"
+
+def _check_config():
+    # futáskor ellenőrizzük, nem importkor: a pipeline a korábbi szakaszokat token nélkül is futtathatja
+    if not (TOKEN and CHAT_ID):
+        raise RuntimeError("Hiányzik TELEGRAM_BOT_TOKEN vagy TELEGRAM_CHAT_ID a .env-ben")
 
 def send_text(text: str, parse_mode: str | None = None):
     # Telegram üzenet limit ~4096 karakter → daraboljuk 3500-as blokkokra
@@ -21,39 +29,73 @@ def send_text(text: str, parse_mode: str | None = None):
         data = {"chat_id": CHAT_ID, "text": p}
         if parse_mode:
             data["parse_mode"] = parse_mode
-        r = requests.post(API_URL, data=data, timeout=30)
+        r = http_client.post(API_URL, data=data, timeout=30)
         if not r.ok:
             raise RuntimeError(f"Telegram hiba: {r.status_code} {r.text}")
         # pici késleltetés flood elkerülésre
         time.sleep(0.4)
 
-def main():
-    target = (date.today() + timedelta(days=1)).isoformat()
-
-    # 1) Cikkek legenerálása holnapra
-    build_articles.build()  # az out/ mappába ír 19 db .md-t
+def pending_messages(target: str) -> list[dict] | None:
+    """A manifest azon üzenetei, amelyeknek ezt a változatát a csatorna még nem kapta meg (None: nincs manifest)."""
+    doc = manifest.load(build_articles.OUTDIR, target)
+    if not doc or not doc["messages"]:
+        return None
+    return manifest.unpublished(doc, manifest.load_published(build_articles.OUTDIR, target, PUBLISHER))
 
-    # 2) Országos nyitó-üzenet
+def publish_plan(target: str, messages: list[dict] | None = None) -> list[tuple[str, str | None]]:
+    """
+    A kiküldendő üzenetek sorrendben: (szöveg, parse_mode). `messages`: a pending_messages() eredménye;
+    ha minden változat kiment már (napközbeni futás változás nélkül), a terv üres.
+    """
+    if messages is None:
+        messages = pending_messages(target)
+    if messages == []:
+        return []
+    # 1) Országos nyitó-üzenet
     header = (
         f"**Milyen idő lesz holnap? – {target}**\n"
         f"Az alábbiakban megyénként küldjük a rövid előrejelzést. "
         f"Források: Open-Meteo + OpenWeather (konszenzus).\n"
     )
-    send_text(header, parse_mode="Markdown")
-
-    # 3) Megyénként küldés (slug alapján a holnapi fájlok)
-    files = sorted(glob.glob(f"out/*-{target}.md"))
-    if not files:
-        send_text("⚠️ Nincs holnapi cikk az out/ mappában.")
-        return
-
-    for path in files:
-        with open(path, "r", encoding="utf-8") as f:
-            txt = f.read().strip()
-        # Markdown hossz csökkentése: cím marad félkövér, a többi sima
-        # (ha marad a teljes tartalom, a chunkolás úgyis elvégzi a darabolást)
-        send_text(txt, parse_mode=None)  # nyers szöveg, biztos kompatibilis
-    send_text("✅ Kiküldés kész.")
+    plan = [(header, "Markdown")]
+
+    # 2) Megyénként küldés – a build manifestjéből, előre darabolva
+    if messages is None:
+        plan.append(("⚠️ Nincs holnapi cikk az out/ mappában.", None))
+        return plan
+
+    for m in messages:
+        for chunk in m["md_chunks"]:
+            plan.append((chunk, None))  # nyers szöveg, biztos kompatibilis
+    plan.append(("✅ Kiküldés kész.", None))
+    return plan
+
+def publish(target: str, start: int = 0, on_sent: Callable[[int], None] | None = None) -> int:
+    """
+    Kiküldés a csatornára a `start`-adik üzenettől. Minden sikeres üzenet után `on_sent(elküldött_db)`,
+    így egy megszakadt kiküldés onnan folytatható, ahol elakadt. Csak a csatornának még ki nem küldött
+    változatok mennek ki; a teljes terv után ezeket kiküldöttnek jelöljük (addig a terv, és így a
+    `start` is, változatlan). Visszatérés: az összes üzenet száma.
+    """
+    _check_config()
+    messages = pending_messages(target)
+    plan = publish_plan(target, messages)
+    if not plan:
+        print(f"ℹ️ {target}: nincs új változat, a csatornára nem megy ki semmi.")
+        return 0
+    for i in range(start, len(plan)):
+        text, parse_mode = plan[i]
+        send_text(text, parse_mode=parse_mode)
+        if on_sent:
+            on_sent(i + 1)
+    if messages:
+        manifest.mark_published(build_articles.OUTDIR, target, PUBLISHER, messages)
+    return len(plan)
+
+def main():
+    # build + kiküldés: a szakaszos futtató végzi (lásd pipeline.py --from-stage / --only-failed)
+    import pipeline
+    raise SystemExit(pipeline.run((date.today() + timedelta(days=1)).isoformat()))
 
 if __name__ == "__main__":
     main()
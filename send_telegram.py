@@ -1,16 +1,19 @@
 # send_telegram.py
-import os, glob, re, argparse, asyncio
-from datetime import datetime
-from typing import List
+import os, argparse, asyncio
+from typing import Iterator
 
 from dotenv import load_dotenv
 load_dotenv()
 
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 
 from telegram import Bot
-from telegram.error import RetryAfter, TimedOut, NetworkError, Forbidden
+from telegram.request import HTTPXRequest
+from telegram.error import RetryAfter, TimedOut, NetworkError, Forbidden, BadRequest
+
+from services.rate_limit import TokenBucket, SharedTokenBucket
+import manifest
 
 # --- ENV ----------------------------------------------------------------
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -24,126 +27,369 @@ def db_fetchall(sql: str, params=None):
         cur.execute(sql, params or {})
         return cur.fetchall()
 
-def get_active_recipients(test_chat: int | None = None) -> List[int]:
-    if test_chat:
-        return [int(test_chat)]
-    sql = """
-    SELECT chat_id
-    FROM public.telegram_users
-    WHERE paused_until IS NULL OR paused_until < NOW();
-    """
-    rows = db_fetchall(sql)
-    return [int(r["chat_id"]) for r in rows]
+# --- Címzettek -----------------------------------------------------------
+# Szerveroldali (nevesített) kurzorral, lapozva olvassuk: a memória nem nő a címzettek számával.
+# --shard i/N: a chat_id hash-e szerint N diszjunkt részre bontva, így több folyamat osztozhat egy futáson.
+TG_RECIPIENT_PAGE = int(os.getenv("TG_RECIPIENT_PAGE", "2000"))
 
-# --- Fájlgyűjtés: csak a legfrissebb dátum ------------------------------
-DATE_RE = re.compile(r"(\d{4}-\d{2}-\d{2})")
+RECIPIENTS_SQL = """
+SELECT u.chat_id, COALESCE(d.files, '{}') AS files
+FROM public.telegram_users u
+LEFT JOIN (
+    SELECT chat_id, array_agg(file) AS files
+    FROM public.broadcast_deliveries
+    WHERE run_date = %(run_date)s
+    GROUP BY chat_id
+) d ON d.chat_id = u.chat_id
+WHERE u.blocked_at IS NULL
+  AND (u.paused_until IS NULL OR u.paused_until < NOW())
+  AND (hashtext(u.chat_id::text) & 2147483647) %% %(shards)s = %(shard)s;
+"""
 
-def _extract_date(path: str) -> datetime | None:
-    m = DATE_RE.search(os.path.basename(path))
-    if not m: 
-        return None
+def parse_shard(value: str) -> tuple[int, int]:
+    """ "i/N" → (i, N), 0 <= i < N."""
     try:
-        return datetime.strptime(m.group(1), "%Y-%m-%d")
+        i, n = (int(x) for x in value.split("/", 1))
     except ValueError:
-        return None
-
-def pick_latest_date() -> str | None:
-    candidates = glob.glob("out/*.txt")
-    dates = [_extract_date(p) for p in candidates]
-    dates = [d for d in dates if d is not None]
-    if not dates:
-        return None
-    latest = max(dates)
-    return latest.strftime("%Y-%m-%d")
-
-def build_file_list(only: str | None) -> List[str]:
-    latest = pick_latest_date()
-    if not latest:
-        return []
-    files = []
-
-    # Országos (ha létezik az adott napra)
-    nat = sorted(glob.glob(f"out/000_orszagos-*-{latest}.txt"))
-    if nat:
-        files.extend(nat)
-
-    # Megyék adott napra
-    county_files = sorted(glob.glob(f"out/*-{latest}.txt"))
-    # szűrés: zárjuk ki az országos fájl(oka)t, amit már hozzáadtunk
-    county_files = [p for p in county_files if not os.path.basename(p).startswith("000_orszagos-")]
-
-    if only:
-        wants = {w.strip().lower() for w in only.split(",")}
-        def _match(p: str) -> bool:
-            base = os.path.basename(p).lower()
-            return any(w in base for w in wants)
-        county_files = [p for p in county_files if _match(p)]
-
-        # „Országos” kulcsszó: ha kéri, de még nem adtuk hozzá nat-ot (pl. nincs az adott napra),
-        # akkor ne tegyünk semmit; ha van, már benn van a lista elején.
-        # (Semmi extra teendő.)
-    files.extend(county_files)
-    return files
+        raise argparse.ArgumentTypeError(f"formátuma i/N, pl. 0/4 (kapott: {value!r})")
+    if n < 1 or not 0 <= i < n:
+        raise argparse.ArgumentTypeError(f"0 <= i < N kell (kapott: {value!r})")
+    return i, n
+
+def iter_recipients(shard: tuple[int, int] = (0, 1), run_date: str | None = None) -> Iterator[list[tuple[int, frozenset]]]:
+    """
+    Aktív címzettek lapokban: [(chat_id, a run_date-re már kézbesített fájlok), ...].
+    `run_date=None` → nincs kihagyás (nem --resume futás).
+    WITH HOLD kurzor: a lekérdezés után commitolunk, így a kiküldés alatt nincs nyitott tranzakció.
+    A hívó zárja le a generátort (close()), ha nem olvassa végig – akkor is felszabadul a kapcsolat.
+    """
+    conn = psycopg2.connect(DATABASE_URL)
+    try:
+        with conn.cursor(name="broadcast_recipients", withhold=True) as cur:
+            cur.itersize = TG_RECIPIENT_PAGE
+            cur.execute(RECIPIENTS_SQL, {"run_date": run_date, "shard": shard[0], "shards": shard[1]})
+            conn.commit()
+            while True:
+                rows = cur.fetchmany(TG_RECIPIENT_PAGE)
+                if not rows:
+                    return
+                yield [(int(chat_id), frozenset(files)) for chat_id, files in rows]
+    finally:
+        conn.close()
+
+def get_delivered_files(run_date: str, chat_id: int) -> frozenset:
+    rows = db_fetchall(
+        "SELECT file FROM public.broadcast_deliveries WHERE run_date = %(d)s AND chat_id = %(c)s;",
+        {"d": run_date, "c": chat_id},
+    )
+    return frozenset(r["file"] for r in rows)
+
+# --- Letiltott / megszűnt chatek ----------------------------------------
+# Futás közben gyűjtjük, a végén egyetlen UPDATE-tel jelöljük; a címzett-lekérdezés kihagyja őket
+# (részleges index csak az aktív sorokra). Ha a user újra ír a botnak, a bot törli a jelölést.
+def ensure_blocked_column():
+    with psycopg2.connect(DATABASE_URL) as conn, conn.cursor() as cur:
+        cur.execute("ALTER TABLE public.telegram_users ADD COLUMN IF NOT EXISTS blocked_at TIMESTAMPTZ;")
+        cur.execute("""
+        CREATE INDEX IF NOT EXISTS telegram_users_active_idx
+            ON public.telegram_users (chat_id, paused_until)
+            WHERE blocked_at IS NULL;
+        """)
+
+def mark_blocked(chat_ids: set[int]) -> int:
+    if not chat_ids:
+        return 0
+    with psycopg2.connect(DATABASE_URL) as conn, conn.cursor() as cur:
+        cur.execute(
+            "UPDATE public.telegram_users SET blocked_at = NOW() "
+            "WHERE chat_id = ANY(%(ids)s) AND blocked_at IS NULL;",
+            {"ids": sorted(chat_ids)},
+        )
+        return cur.rowcount
+
+def _is_dead_chat(err: Exception) -> bool:
+    """Forbidden: letiltott bot / deaktivált user; BadRequest "chat not found": megszűnt chat."""
+    if isinstance(err, Forbidden):
+        return True
+    return isinstance(err, BadRequest) and "chat not found" in str(err).lower()
+
+# --- Kézbesítési napló ---------------------------------------------------
+# (futás napja, chat, fájl) → sikeresen kiment. Megszakadt futás után a --resume csak a maradékot küldi.
+TG_JOURNAL_BATCH = int(os.getenv("TG_JOURNAL_BATCH", "200"))
+TG_JOURNAL_FLUSH_S = float(os.getenv("TG_JOURNAL_FLUSH_S", "2"))
+
+def ensure_journal_table():
+    with psycopg2.connect(DATABASE_URL) as conn, conn.cursor() as cur:
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS public.broadcast_deliveries (
+            run_date     DATE        NOT NULL,
+            chat_id      BIGINT      NOT NULL,
+            file         TEXT        NOT NULL,
+            delivered_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (run_date, chat_id, file)
+        );
+        """)
+
+def _write_deliveries(run_date: str, batch: list[tuple[int, str]]):
+    with psycopg2.connect(DATABASE_URL) as conn, conn.cursor() as cur:
+        execute_values(
+            cur,
+            "INSERT INTO public.broadcast_deliveries (run_date, chat_id, file) VALUES %s "
+            "ON CONFLICT DO NOTHING;",
+            [(run_date, chat_id, file) for chat_id, file in batch],
+        )
+
+class DeliveryJournal:
+    """Sikeres küldések naplója; kötegelve írjuk (TG_JOURNAL_BATCH darabonként vagy TG_JOURNAL_FLUSH_S mp-enként)."""
+
+    def __init__(self, run_date: str):
+        self.run_date = run_date
+        self._pending: list[tuple[int, str]] = []
+        self._full = asyncio.Event()
+        self._stopping = False
+
+    def record(self, chat_id: int, file: str):
+        self._pending.append((chat_id, file))
+        if len(self._pending) >= TG_JOURNAL_BATCH:
+            self._full.set()
+
+    async def flush(self):
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        write = asyncio.ensure_future(asyncio.to_thread(_write_deliveries, self.run_date, batch))
+        # az eredményt callback kezeli: ha a várakozót megszakítják, a köteg hiba esetén akkor is visszakerül
+        write.add_done_callback(lambda t: self._written(batch, t))
+        await asyncio.wait([write])
+
+    def _written(self, batch: list[tuple[int, str]], write: asyncio.Future):
+        e = write.exception() if not write.cancelled() else asyncio.CancelledError()
+        if e is not None:
+            print(f"⚠️ Kézbesítési napló írása sikertelen ({len(batch)} sor), később újra: {e}")
+            self._pending[:0] = batch
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def stop(self):
+        """A run() a folyamatban lévő írás után kilép; utána a hívó egy utolsó flush()-t végez."""
+        self._stopping = True
+        self._full.set()
+
+    async def run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._full.wait(), TG_JOURNAL_FLUSH_S)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            await self.flush()
+
+# --- Üzenetlista: a build által írt manifestből ------------------------
+OUTDIR = "out"
+
+def publisher_name(shard: tuple[int, int] | None) -> str:
+    """A manifest.mark_published() küldőneve; shardonként külön, mert mindegyik a saját címzettjeinek küld."""
+    return f"telegram-{shard[0]}-{shard[1]}" if shard else "telegram"
+
+def select_messages(doc: dict, only: str | None, changed_only: bool = False,
+                    published: dict[str, str] | None = None) -> list[dict]:
+    """
+    Az országos üzenet mindig elöl; `only` esetén a megyék közül csak az egyezők.
+    `changed_only`: csak azok az üzenetek, amelyeknek ezt a változatát (`published`: slug → input_hash)
+    még nem küldtük ki – napközbeni frissítéshez; az országos is csak ha változott.
+    """
+    msgs = doc["messages"]
+    if changed_only:
+        msgs = manifest.unpublished(doc, published or {})
+    if not only:
+        return list(msgs)
+    wants = {w.strip().lower() for w in only.split(",")}
+    def _match(m: dict) -> bool:
+        base = m["txt_file"].lower()
+        return any(w in base or w == m["key"].lower() for w in wants)
+    return [m for m in msgs if m["kind"] == "national" or _match(m)]
 
 # --- Küldés --------------------------------------------------------------
-async def send_text(bot: Bot, chat_id: int, text: str):
-    # 4096 Telegram limit – hagyjunk pár karakter tartalékot
-    chunk = text[:4090]
-    while True:
+# Telegram bot limit: kb. 30 üzenet/mp összesen, chatenként kb. 1 üzenet/mp.
+# Egy globális token bucket osztja a keretet a workerek között; egy chat üzeneteit mindig
+# ugyanaz a worker küldi sorban, így a sorrend megmarad. --shard esetén a bucket állapota fájlban
+# közös (TG_RATE_STATE_PATH), így az összes shard együtt marad TG_GLOBAL_RATE alatt – egy gépen futó
+# folyamatokra; több gépre osztva a TG_GLOBAL_RATE-et gépenként le kell osztani.
+TG_GLOBAL_RATE = float(os.getenv("TG_GLOBAL_RATE", "28"))
+_DEFAULT_RATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "tg_rate.json")
+TG_RATE_STATE_PATH = os.getenv("TG_RATE_STATE_PATH", _DEFAULT_RATE_PATH)
+TG_WORKERS = int(os.getenv("TG_WORKERS", "64"))
+TG_PER_CHAT_INTERVAL_S = float(os.getenv("TG_PER_CHAT_INTERVAL", "1.0"))
+TG_MAX_ATTEMPTS = int(os.getenv("TG_MAX_ATTEMPTS", "5"))
+
+
+async def send_text(bot: Bot, bucket: TokenBucket, chat_id: int, chunk: str):
+    # a darabolás (4096-os limit) már a buildben megtörtént, lásd manifest.TG_CHUNK
+    for attempt in range(1, TG_MAX_ATTEMPTS + 1):
+        await bucket.take_async()
         try:
             await bot.send_message(chat_id=chat_id, text=chunk)
             return
         except RetryAfter as e:
-            wait = int(getattr(e, "retry_after", 40))
-            print(f"⏳ Flood control – várok {wait} mp-et… (chat={chat_id})")
-            await asyncio.sleep(wait)
+            # a flood control az egész botra vonatkozik → minden worker vár, nem csak ez
+            wait = getattr(e, "retry_after", 40)
+            wait = wait.total_seconds() if hasattr(wait, "total_seconds") else float(wait)
+            print(f"⏳ Flood control – minden küldés szünetel {wait:.0f} mp-ig… (chat={chat_id})")
+            bucket.pause(wait)
         except TimedOut:
             print(f"⚠️ Timed out – újrapróbálom 5 mp múlva (chat={chat_id})")
             await asyncio.sleep(5)
+        except BadRequest:
+            # a NetworkError alosztálya, de újrapróbálni felesleges (pl. "chat not found")
+            raise
         except (NetworkError,) as e:
             print(f"⚠️ Hálózati hiba: {e} – újrapróbálom 5 mp múlva (chat={chat_id})")
             await asyncio.sleep(5)
+    raise RuntimeError(f"{TG_MAX_ATTEMPTS} próbálkozás után sem ment ki")
+
+
+async def send_to_chat(bot: Bot, bucket: TokenBucket, journal: DeliveryJournal, dead: set[int], chat_id: int,
+                       messages: list[dict]) -> int:
+    """Egy címzett összes üzenete sorban, chatenkénti ütemezéssel. Visszatérés: elküldött darabszám."""
+    sent = 0
+    last = 0.0
+    loop = asyncio.get_running_loop()
+    # országos üzenet megy előre: a manifest már így rendezi
+    for m in messages:
+        try:
+            for chunk in m["tg_chunks"]:
+                gap = last + TG_PER_CHAT_INTERVAL_S - loop.time()
+                if gap > 0:
+                    await asyncio.sleep(gap)
+                await send_text(bot, bucket, chat_id, chunk)
+                last = loop.time()
+            journal.record(chat_id, m["txt_file"])
+            tag = "Országos elküldve" if m["kind"] == "national" else "Megye elküldve"
+            print(f"✅ {tag} → {chat_id}: {m['txt_file']}")
+            sent += 1
+        except Exception as e:
+            if _is_dead_chat(e):
+                print(f"🚫 A felhasználó letiltotta a botot / megszűnt a chat (chat={chat_id}) – kihagyom: {e}")
+                dead.add(chat_id)
+                break
+            print(f"❌ Hiba ({chat_id}, {m['txt_file']}): {e}")
+            # megyünk a következő üzenetre
+    return sent
 
-async def run_async(only: str | None, test_chat: int | None):
-    bot = Bot(TOKEN)
-    recipients = get_active_recipients(test_chat=test_chat)
-    if not recipients:
-        print("ℹ️ Nincs aktív címzett (paused_until lehet beállítva mindenkinek).")
-        return
 
-    files = build_file_list(only=only)
-    if not files:
-        print("ℹ️ Nincs küldhető .txt az out/ mappában (ellenőrizd a buildet és a fájldátumokat).")
+async def run_async(only: str | None, test_chat: int | None, resume: bool = False,
+                    shard: tuple[int, int] | None = None, changed_only: bool = False):
+    # alapból egyetlen HTTP kapcsolat lenne – annyi kell, ahány worker párhuzamosan küld
+    bot = Bot(TOKEN, request=HTTPXRequest(connection_pool_size=TG_WORKERS, pool_timeout=30))
+    doc = manifest.load(OUTDIR)
+    if not doc:
+        print("ℹ️ Nincs manifest az out/ mappában (futott már a build?).")
+        return
+    publisher = publisher_name(shard)
+    published = manifest.load_published(OUTDIR, doc["date"], publisher) if changed_only else None
+    messages = select_messages(doc, only, changed_only, published)
+    if not messages:
+        print(f"ℹ️ Nincs küldhető üzenet a {doc['date']} manifestben (--only / --changed-only szűrő?).")
         return
 
+    run_date = doc["date"]
+    ensure_blocked_column()
+    ensure_journal_table()
+    if resume:
+        print(f"↩️ Folytatás: a naplóban már kézbesített (címzett, fájl) párok kimaradnak ({run_date}).")
+    label = f" [shard {shard[0]}/{shard[1]}]" if shard else ""
+    journal = DeliveryJournal(run_date)
+    dead: set[int] = set()
+
+    if shard:
+        bucket = SharedTokenBucket(TG_RATE_STATE_PATH, TG_GLOBAL_RATE, TG_GLOBAL_RATE)
+    else:
+        bucket = TokenBucket(TG_GLOBAL_RATE, TG_GLOBAL_RATE)
+    # korlátos sor: a kurzor csak annyival jár a küldés előtt, amennyi a sorba fér
+    queue: asyncio.Queue[tuple[int, frozenset] | None] = asyncio.Queue(maxsize=TG_RECIPIENT_PAGE)
+    recipient_count = 0
     sent_count = 0
-    for chat_id in recipients:
-        # országos fájlok menjenek előre: már így építettük a listát
-        for path in files:
-            try:
-                with open(path, "r", encoding="utf-8") as f:
-                    text = f.read()
-                await send_text(bot, chat_id, text)
-                tag = "Országos elküldve" if os.path.basename(path).startswith("000_orszagos-") \
-                      else "Megye elküldve"
-                print(f"✅ {tag} → {chat_id}: {os.path.basename(path)}")
-                sent_count += 1
-                await asyncio.sleep(0.8)  # óvatosan a rate limittel
-            except Forbidden:
-                print(f"🚫 A felhasználó letiltotta a botot (chat={chat_id}) – kihagyom.")
-                break
-            except Exception as e:
-                print(f"❌ Hiba ({chat_id}, {os.path.basename(path)}): {e}")
-                # megyünk a következő fájlra / címzettre
 
-    print(f"🎉 Kész: {len(recipients)} címzettnek összesen {sent_count} üzenet ment ki.")
+    async def producer():
+        nonlocal recipient_count
+        pages = None
+        fetching = None
+        try:
+            if test_chat:
+                done = await asyncio.to_thread(get_delivered_files, run_date, int(test_chat)) if resume else frozenset()
+                pages = iter([[(int(test_chat), done)]])
+            else:
+                pages = iter_recipients(shard or (0, 1), run_date if resume else None)
+            while True:
+                fetching = asyncio.ensure_future(asyncio.to_thread(next, pages, None))
+                page = await asyncio.shield(fetching)
+                if page is None:
+                    break
+                for item in page:
+                    recipient_count += 1
+                    await queue.put(item)
+        finally:
+            if pages is not None:
+                # hiba/megszakítás esetén is lezárjuk a kurzort és a kapcsolatát; a futó lapkérést
+                # előbb megvárjuk, mert a generátort nem lehet lezárni, amíg egy másik szál léptet
+                if fetching is not None and not fetching.done():
+                    await asyncio.wait([fetching])
+                await asyncio.to_thread(getattr(pages, "close", lambda: None))
+            for _ in range(TG_WORKERS):
+                await queue.put(None)
+
+    async def worker():
+        nonlocal sent_count
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            chat_id, done = item
+            todo = [m for m in messages if m["txt_file"] not in done]
+            if not todo:
+                continue
+            sent = await send_to_chat(bot, bucket, journal, dead, chat_id, todo)
+            sent_count += sent
+
+    started = asyncio.get_running_loop().time()
+    flusher = asyncio.create_task(journal.run())
+    try:
+        async with bot:
+            await asyncio.gather(producer(), *(worker() for _ in range(TG_WORKERS)))
+    finally:
+        # nem cancel(): a félbemaradt írás hibája is visszatenné a köteget, de már senki nem várna rá
+        journal.stop()
+        await flusher
+        await journal.flush()
+        if journal.pending:
+            print(f"⚠️ {journal.pending} kézbesítés nem került a naplóba – egy --resume futás ezeket újraküldi.")
+        if dead:
+            marked = await asyncio.to_thread(mark_blocked, dead)
+            print(f"🚫 {marked} letiltott / megszűnt chat megjelölve, a következő kiküldésből kimaradnak.")
+    took = asyncio.get_running_loop().time() - started
+    if not test_chat:
+        # a következő --changed-only futás ezekhez a változatokhoz méri, mi új
+        manifest.mark_published(OUTDIR, run_date, publisher, messages)
+    if not recipient_count:
+        print(f"ℹ️ Nincs aktív címzett{label} (paused_until lehet beállítva mindenkinek).")
+        return
+    print(f"🎉 Kész{label}: {recipient_count} címzettnek összesen {sent_count} üzenet ment ki ({took:.0f} mp).")
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--only", help='Csak ezek a megyék/“Országos” (vesszővel): pl. "Országos, Zala, Baranya"', default=None)
     ap.add_argument("--test-chat", type=int, help="Felülírja a címzetteket, ide küld tesztként", default=None)
+    ap.add_argument("--resume", action="store_true",
+                    help="Megszakadt futás folytatása: a naplóban már kézbesített (címzett, fájl) párokat kihagyja")
+    ap.add_argument("--shard", type=parse_shard, default=None, metavar="i/N",
+                    help="A címzettek i. része N-ből (chat_id hash szerint); a shardok közös sebességkereten osztoznak")
+    ap.add_argument("--changed-only", action="store_true",
+                    help="Csak a még ki nem küldött változatok (a legutóbbi kiküldés óta változott cikkek)")
     args = ap.parse_args()
-    asyncio.run(run_async(only=args.only, test_chat=args.test_chat))
+    asyncio.run(run_async(only=args.only, test_chat=args.test_chat, resume=args.resume, shard=args.shard,
+                          changed_only=args.changed_only))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,119 @@
+# services/ai_cache.py
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# AI-szöveg cache: memóriában LRU+TTL, opcionálisan SQLite-ba is írva (újraindítás után is megmarad).
+# Kulcs: (modell, nyelv, hely, céldátum, ma/holnap, kerekített tmax/tmin/csapadék) – ugyanaz a prompt,
+# ugyanaz a válasz, modellhívás nélkül.
+_DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "ai_text.sqlite3")
+AI_CACHE_PATH = os.getenv("AI_CACHE_PATH", _DEFAULT_PATH)   # üres string → csak memória
+AI_CACHE_TTL_S = int(os.getenv("AI_CACHE_TTL", "21600"))     # 6 óra
+AI_CACHE_MAX = int(os.getenv("AI_CACHE_MAX", "5000"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ai_text_cache (
+    key        TEXT PRIMARY KEY,
+    text       TEXT NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ai_text_cache_expires ON ai_text_cache (expires_at);
+"""
+
+_mem: OrderedDict[str, tuple[float, str]] = OrderedDict()
+_mem_lock = threading.Lock()
+_local = threading.local()
+_puts = 0
+_EVICT_EVERY = 200
+
+
+def key_of(model: str, lang: str, place: str, target: str, when: str,
+           tmax: float, tmin: float, precip: float) -> str:
+    """Kulcs a promptban szereplő (1 tizedesre kerekített) értékekből."""
+    raw = "|".join([model, lang, place, target, when, f"{tmax:.1f}", f"{tmin:.1f}", f"{precip:.1f}"])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _conn() -> sqlite3.Connection | None:
+    if not AI_CACHE_PATH:
+        return None
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(AI_CACHE_PATH) or ".", exist_ok=True)
+        conn = sqlite3.connect(AI_CACHE_PATH, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        conn.executescript(_SCHEMA)
+        _local.conn = conn
+    return conn
+
+
+def _remember(key: str, expires_at: float, text: str) -> None:
+    with _mem_lock:
+        _mem[key] = (expires_at, text)
+        _mem.move_to_end(key)
+        while len(_mem) > AI_CACHE_MAX:
+            _mem.popitem(last=False)
+
+
+def peek(key: str) -> str | None:
+    """Csak a memóriából (nem blokkol) – event loopból ezt érdemes előbb kérdezni."""
+    now = time.time()
+    with _mem_lock:
+        hit = _mem.get(key)
+        if hit is not None and hit[0] > now:
+            _mem.move_to_end(key)
+            return hit[1]
+    return None
+
+
+def get(key: str) -> str | None:
+    now = time.time()
+    with _mem_lock:
+        hit = _mem.get(key)
+        if hit is not None:
+            if hit[0] > now:
+                _mem.move_to_end(key)
+                return hit[1]
+            del _mem[key]
+    try:
+        conn = _conn()
+        if conn is None:
+            return None
+        row = conn.execute(
+            "SELECT text, expires_at FROM ai_text_cache WHERE key=? AND expires_at > ?;", (key, now)
+        ).fetchone()
+    except Exception as e:
+        logger.warning("ai_cache.get hiba: %s", e)
+        return None
+    if row is None:
+        return None
+    _remember(key, row[1], row[0])
+    return row[0]
+
+
+def put(key: str, text: str) -> None:
+    global _puts
+    expires_at = time.time() + AI_CACHE_TTL_S
+    _remember(key, expires_at, text)
+    try:
+        conn = _conn()
+        if conn is None:
+            return
+        conn.execute(
+            "INSERT OR REPLACE INTO ai_text_cache (key, text, expires_at) VALUES (?, ?, ?);",
+            (key, text, expires_at),
+        )
+        with _mem_lock:
+            _puts += 1
+            due = _puts % _EVICT_EVERY == 0
+        if due:
+            conn.execute("DELETE FROM ai_text_cache WHERE expires_at <= ?;", (time.time(),))
+    except Exception as e:
+        logger.warning("ai_cache.put hiba: %s", e)
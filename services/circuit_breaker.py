@@ -0,0 +1,88 @@
+# services/circuit_breaker.py
+import os
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+CB_FAILURE_THRESHOLD = int(os.getenv("CB_FAILURE_THRESHOLD", "5"))
+CB_COOLDOWN_S = float(os.getenv("CB_COOLDOWN_S", "60"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """A szolgáltató megszakítója nyitva – a hívást azonnal kihagyjuk."""
+
+
+class CircuitBreaker:
+    """
+    N egymást követő hiba után nyit, a cool-down alatt minden hívást azonnal elutasít,
+    utána félig nyit: egyetlen próbahívás dönti el, hogy zár vagy újra nyit.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = CB_FAILURE_THRESHOLD, cooldown_s: float = CB_COOLDOWN_S):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown_s = cooldown_s
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            logger.warning("circuit[%s]: %s → %s (hibák: %d)", self.name, self.state, state, self.failures)
+            self.state = state
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.cooldown_s:
+                    return False
+                self._set_state(HALF_OPEN)
+            # HALF_OPEN: egyszerre csak egy próbahívás
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._probe_in_flight = False
+            self._set_state(CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._set_state(OPEN)
+
+    def release_probe(self) -> None:
+        """Megszakított hívás (pl. CancelledError): se siker, se hiba – csak a próbahívás helye szabadul fel."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            retry_in = 0.0
+            if self.state == OPEN:
+                retry_in = max(0.0, self.cooldown_s - (time.monotonic() - self.opened_at))
+            return {"state": self.state, "failures": self.failures, "retry_in_s": round(retry_in, 1)}
+
+
+BREAKERS = {
+    "open_meteo": CircuitBreaker("open_meteo"),
+    "openweather": CircuitBreaker("openweather"),
+}
+
+
+def breaker_states() -> dict[str, dict]:
+    return {name: br.snapshot() for name, br in BREAKERS.items()}
@@ -0,0 +1,342 @@
+# services/fetch_engine.py
+import os
+import asyncio
+from datetime import date, timedelta
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from services import forecast_cache, ow_quota
+from services.singleflight import Group, AsyncGroup
+from services.circuit_breaker import BREAKERS, CircuitOpenError
+from services.ow_quota import OpenWeatherQuotaError, PRIORITY_NORMAL
+from services.open_meteo import (
+    get_open_meteo_series, get_open_meteo_series_many, aget_open_meteo_series, _split_batches,
+)
+from services.openweather import get_openweather_series, aget_openweather_series
+
+# Szolgáltatónként külön szálkészlet → külön párhuzamossági korlát
+OM_MAX_PARALLEL = int(os.getenv("OM_MAX_PARALLEL", "4"))
+OW_MAX_PARALLEL = int(os.getenv("OW_MAX_PARALLEL", "8"))
+
+_EXECUTORS = {
+    "open_meteo": ThreadPoolExecutor(max_workers=OM_MAX_PARALLEL, thread_name_prefix="fetch-om"),
+    "openweather": ThreadPoolExecutor(max_workers=OW_MAX_PARALLEL, thread_name_prefix="fetch-ow"),
+}
+
+
+def _submit(provider: str, fn, *args, **kwargs):
+    return _EXECUTORS[provider].submit(fn, *args, **kwargs)
+
+
+def _failed(err: Exception) -> Future:
+    fut = Future()
+    fut.set_exception(err)
+    return fut
+
+
+def _target() -> date:
+    # alapértelmezett céldátum: holnap
+    return date.today() + timedelta(days=1)
+
+
+# ---- napi sorok: egy upstream válasz → minden nap külön cache-bejegyzés ----
+
+def _variant(provider: str, lang: str, units: str) -> str:
+    """A választ befolyásoló paraméterek: az Open-Meteo mindig metrikus és nyelvfüggetlen, az OW nem."""
+    return "" if provider == "open_meteo" else f"{units}:{lang}"
+
+
+def _store_series(provider: str, lat: float, lon: float, series: list[dict], variant: str = "") -> None:
+    for day in series:
+        forecast_cache.put(provider, lat, lon, date.fromisoformat(day["date"]), day, variant=variant)
+
+
+def _cached_days(provider: str, lat: float, lon: float, targets: list[date], variant: str = "") -> list[dict] | None:
+    """Csak akkor ad vissza adatot, ha az összes kért nap a cache-ben van."""
+    out = []
+    for t in targets:
+        hit = forecast_cache.get(provider, lat, lon, t, variant)
+        if hit is None:
+            return None
+        out.append(hit)
+    return out
+
+
+def _pick(series: list[dict], targets: list[date]) -> list[dict]:
+    by_date = {day["date"]: day for day in series}
+    missing = [t.isoformat() for t in targets if t.isoformat() not in by_date]
+    if missing:
+        raise LookupError(f"Nincs előrejelzés ezekre a napokra: {', '.join(missing)}")
+    return [by_date[t.isoformat()] for t in targets]
+
+
+def _admit(provider: str):
+    """Breaker-ellenőrzés; elutasításkor a lefoglalt OW keretet visszaadjuk."""
+    br = BREAKERS[provider]
+    if not br.allow():
+        if provider == "openweather":
+            ow_quota.refund()
+        raise CircuitOpenError(f"{provider}: circuit breaker nyitva, a hívást kihagyjuk.")
+    return br
+
+
+def _guarded(provider: str, fn, *args, **kwargs):
+    """
+    Szolgáltatóhívás a circuit breakeren át. A breakert a végrehajtó szálon, közvetlenül a hívás előtt
+    kérdezzük, így a sorban álló hívások is azonnal kimaradnak, amint a breaker kinyit.
+    """
+    br = _admit(provider)
+    try:
+        if provider == "openweather":
+            ow_quota.wait_for_slot()
+        result = fn(*args, **kwargs)
+    except Exception:
+        br.record_failure()
+        raise
+    br.record_success()
+    return result
+
+
+def _fetch_series(provider: str, lat: float, lon: float, lang: str, units: str) -> list[dict]:
+    if provider == "open_meteo":
+        series = _guarded(provider, get_open_meteo_series, lat, lon, lang=lang)
+    else:
+        series = _guarded(provider, get_openweather_series, lat, lon, units=units, lang=lang)
+    _store_series(provider, lat, lon, series, _variant(provider, lang, units))
+    return series
+
+
+def _days_or_submit(provider: str, lat: float, lon: float, targets: list[date], lang: str, units: str,
+                    priority: int = PRIORITY_NORMAL):
+    """
+    Cache-találat esetén (napok, None), különben (None, future a teljes sorra).
+    OpenWeathernél a hívás előtt a napi keretből is foglalunk; ha nem jár, a future a kvóta-hibát hordozza.
+    """
+    hit = _cached_days(provider, lat, lon, targets, _variant(provider, lang, units))
+    if hit is not None:
+        return hit, None
+    return None, _submit_fetch(provider, lat, lon, lang, units, priority)
+
+
+# Azonos (szolgáltató, cache-cella, nyelv, mértékegység) lekérésekből egyszerre csak egy fut upstream felé;
+# a többi hívó – szálon (API, build) vagy event loopon (bot) – ugyanannak az eredményét kapja.
+_FLIGHTS = Group()
+_AFLIGHTS = AsyncGroup()
+
+
+def _flight_key(provider: str, lat: float, lon: float, lang: str, units: str) -> tuple:
+    return provider, forecast_cache.cell_of(lat, lon), _variant(provider, lang, units)
+
+
+def _submit_fetch(provider: str, lat: float, lon: float, lang: str, units: str, priority: int) -> Future:
+    def _start() -> Future:
+        if provider == "openweather" and not ow_quota.try_reserve(priority):
+            return _failed(OpenWeatherQuotaError("OpenWeather napi keret elfogyott ennek a prioritásnak."))
+        return _submit(provider, _fetch_series, provider, lat, lon, lang, units)
+
+    return _FLIGHTS.submit(_flight_key(provider, lat, lon, lang, units), _start)
+
+
+def _resolve(days: list[dict] | None, fut, targets: list[date]) -> tuple[list[dict] | None, Exception | None]:
+    if fut is None:
+        return days, None
+    try:
+        return _pick(fut.result(), targets), None
+    except Exception as e:
+        return None, e
+
+
+def fetch_days(lat: float, lon: float, targets: list[date], *, lang: str = "hu", units: str = "metric",
+               priority: int = PRIORITY_NORMAL) -> dict:
+    """
+    Egy pont, több nap: Open-Meteo és OpenWeather párhuzamosan, szolgáltatónként egyetlen upstream hívással.
+    A `priority` (ow_quota.PRIORITY_*) dönti el, jár-e még OW hívás a napi keretből.
+    Visszatérés: {"om": [nap, ...]|None, "ow": [nap, ...]|None, "om_error": Exception|None, "ow_error": Exception|None}
+    """
+    om_days, om_fut = _days_or_submit("open_meteo", lat, lon, targets, lang, units)
+    ow_days, ow_fut = _days_or_submit("openweather", lat, lon, targets, lang, units, priority)
+    om, om_err = _resolve(om_days, om_fut, targets)
+    ow, ow_err = _resolve(ow_days, ow_fut, targets)
+    return {"om": om, "ow": ow, "om_error": om_err, "ow_error": ow_err}
+
+
+def fetch_pair(lat: float, lon: float, *, target: date | None = None, lang: str = "hu", units: str = "metric",
+               priority: int = PRIORITY_NORMAL) -> dict:
+    """
+    Egy pont, egy nap (alapból holnap): Open-Meteo és OpenWeather párhuzamosan.
+    Visszatérés: {"om": dict|None, "ow": dict|None, "om_error": Exception|None, "ow_error": Exception|None}
+    """
+    return _single(fetch_days(lat, lon, [target or _target()], lang=lang, units=units, priority=priority))
+
+
+def _single(res: dict) -> dict:
+    return {
+        "om": res["om"][0] if res["om"] else None,
+        "ow": res["ow"][0] if res["ow"] else None,
+        "om_error": res["om_error"],
+        "ow_error": res["ow_error"],
+    }
+
+
+def fetch_week(lat: float, lon: float, *, days: int = 7, lang: str = "hu", units: str = "metric",
+               priority: int = PRIORITY_NORMAL) -> dict:
+    """Mától számított `days` nap egy pontra – ugyanaz a szerkezet, mint a fetch_days()-é."""
+    today = date.today()
+    return fetch_days(lat, lon, [today + timedelta(days=i) for i in range(days)],
+                      lang=lang, units=units, priority=priority)
+
+
+def _open_meteo_batch(batch: list[tuple[float, float]], lang: str) -> list[tuple[list[dict] | None, Exception | None]]:
+    """Egy OM batch; ha a batch-kérés elbukik, pontonként próbáljuk újra (ugyanazon a szálon)."""
+    try:
+        results = [(series, None) for series in _guarded("open_meteo", get_open_meteo_series_many, batch, lang=lang)]
+    except Exception:
+        results = []
+        for lat, lon in batch:
+            try:
+                results.append((_guarded("open_meteo", get_open_meteo_series, lat, lon, lang=lang), None))
+            except Exception as e:
+                results.append((None, e))
+    for (lat, lon), (series, _) in zip(batch, results):
+        if series is not None:
+            _store_series("open_meteo", lat, lon, series)
+    return results
+
+
+def fetch_many(coords: list[tuple[float, float]], *, target: date | None = None,
+               lang: str = "hu", units: str = "metric", priorities: list[int] | None = None) -> list[dict]:
+    """
+    Sok pont párhuzamosan: OM batch-enként, OW pontonként, mindkettő a saját korlátjával.
+    Az OW napi keretét prioritás szerint osztjuk ki (`priorities`, pontonként; alapból mind NORMAL):
+    előbb a legértékesebb pontok foglalnak, a többi szükség esetén csak Open-Meteót kap.
+    Az eredmény sorrendje megegyezik a bemenetével (determinisztikus kimenet).
+    Elemek: ugyanaz a szerkezet, mint a fetch_pair()-é.
+    """
+    coords = [(float(lat), float(lon)) for lat, lon in coords]
+    targets = [target or _target()]
+    priorities = list(priorities) if priorities is not None else [PRIORITY_NORMAL] * len(coords)
+
+    # cache-ből, ami megvan; csak a hiányzó pontok mennek a szolgáltatókhoz
+    om_hits = [_cached_days("open_meteo", lat, lon, targets) for lat, lon in coords]
+    om_missing = [c for c, hit in zip(coords, om_hits) if hit is None]
+    om_futs = [_submit("open_meteo", _open_meteo_batch, b, lang) for b in _split_batches(om_missing)]
+    ow_variant = _variant("openweather", lang, units)
+    ow_slots: list = [(_cached_days("openweather", lat, lon, targets, ow_variant), None) for lat, lon in coords]
+    ow_missing = [i for i, (hit, _) in enumerate(ow_slots) if hit is None]
+    # foglalás prioritás szerint (stabil rendezés), beküldés az eredeti sorrendben
+    ow_order = sorted(ow_missing, key=lambda i: -priorities[i])
+    allowed = {i for i in ow_order if ow_quota.try_reserve(priorities[i])}
+    for i in ow_missing:
+        lat, lon = coords[i]
+        if i in allowed:
+            ow_slots[i] = (None, _submit("openweather", _fetch_series, "openweather", lat, lon, lang, units))
+        else:
+            ow_slots[i] = (None, _failed(OpenWeatherQuotaError("OpenWeather napi keret elfogyott – csak Open-Meteo.")))
+
+    om_fetched: list[tuple[list[dict] | None, Exception | None]] = []
+    for fut in om_futs:
+        om_fetched.extend(fut.result())
+    fetched_iter = iter(om_fetched)
+
+    out = []
+    for om_hit, (ow_days, ow_fut) in zip(om_hits, ow_slots):
+        if om_hit is not None:
+            om, om_err = om_hit[0], None
+        else:
+            series, om_err = next(fetched_iter)
+            om = None
+            if series is not None:
+                try:
+                    om = _pick(series, targets)[0]
+                except LookupError as e:
+                    om_err = e
+        ow, ow_err = _resolve(ow_days, ow_fut, targets)
+        out.append({"om": om, "ow": ow[0] if ow else None, "om_error": om_err, "ow_error": ow_err})
+    return out
+
+
+# ---- async út (bot): ugyanaz a cache / kvóta / breaker, nem blokkoló hálózati hívásokkal ----
+# A SQLite cache és a kvótafájl (flock) blokkoló I/O – ezeket asyncio.to_thread-del hívjuk.
+
+_async_limits: dict[tuple[int, str], asyncio.Semaphore] = {}
+
+
+def _async_limit(provider: str) -> asyncio.Semaphore:
+    """Szolgáltatónkénti párhuzamossági korlát az aktuális event loopban."""
+    key = (id(asyncio.get_running_loop()), provider)
+    sem = _async_limits.get(key)
+    if sem is None:
+        sem = asyncio.Semaphore(OM_MAX_PARALLEL if provider == "open_meteo" else OW_MAX_PARALLEL)
+        _async_limits[key] = sem
+    return sem
+
+
+async def _aadmit(provider: str):
+    """Az _admit() async párja: a kvóta-visszaadás (fájlzár) nem az event loopon fut."""
+    br = BREAKERS[provider]
+    if not br.allow():
+        if provider == "openweather":
+            await asyncio.to_thread(ow_quota.refund)
+        raise CircuitOpenError(f"{provider}: circuit breaker nyitva, a hívást kihagyjuk.")
+    return br
+
+
+async def _afetch_series(provider: str, lat: float, lon: float, lang: str, units: str) -> list[dict]:
+    async with _async_limit(provider):
+        br = await _aadmit(provider)
+        try:
+            if provider == "open_meteo":
+                series = await aget_open_meteo_series(lat, lon, lang=lang)
+            else:
+                await ow_quota.wait_for_slot_async()
+                series = await aget_openweather_series(lat, lon, units=units, lang=lang)
+        except Exception:
+            br.record_failure()
+            raise
+        except BaseException:
+            # megszakítás (wait_for / handler timeout): nem hiba, de a félig nyitott próbahely szabaduljon fel
+            br.release_probe()
+            raise
+        br.record_success()
+    # SQLite írás (timeout=5) → külön szálon, hogy ne akassza meg az event loopot
+    await asyncio.to_thread(_store_series, provider, lat, lon, series, _variant(provider, lang, units))
+    return series
+
+
+async def _aprovider_days(provider: str, lat: float, lon: float, targets: list[date], lang: str, units: str,
+                          priority: int) -> tuple[list[dict] | None, Exception | None]:
+    hit = await asyncio.to_thread(_cached_days, provider, lat, lon, targets, _variant(provider, lang, units))
+    if hit is not None:
+        return hit, None
+
+    async def _start() -> list[dict]:
+        if provider == "openweather" and not await asyncio.to_thread(ow_quota.try_reserve, priority):
+            raise OpenWeatherQuotaError("OpenWeather napi keret elfogyott ennek a prioritásnak.")
+        return await _afetch_series(provider, lat, lon, lang, units)
+
+    try:
+        series = await _AFLIGHTS.do(_flight_key(provider, lat, lon, lang, units), _start)
+        return _pick(series, targets), None
+    except Exception as e:
+        return None, e
+
+
+async def afetch_days(lat: float, lon: float, targets: list[date], *, lang: str = "hu", units: str = "metric",
+                      priority: int = PRIORITY_NORMAL) -> dict:
+    """A fetch_days() async párja: a két szolgáltató egyszerre, az event loop blokkolása nélkül."""
+    (om, om_err), (ow, ow_err) = await asyncio.gather(
+        _aprovider_days("open_meteo", lat, lon, targets, lang, units, priority),
+        _aprovider_days("openweather", lat, lon, targets, lang, units, priority),
+    )
+    return {"om": om, "ow": ow, "om_error": om_err, "ow_error": ow_err}
+
+
+async def afetch_pair(lat: float, lon: float, *, target: date | None = None, lang: str = "hu",
+                      units: str = "metric", priority: int = PRIORITY_NORMAL) -> dict:
+    return _single(await afetch_days(lat, lon, [target or _target()], lang=lang, units=units, priority=priority))
+
+
+async def afetch_week(lat: float, lon: float, *, days: int = 7, lang: str = "hu", units: str = "metric",
+                      priority: int = PRIORITY_NORMAL) -> dict:
+    today = date.today()
+    return await afetch_days(lat, lon, [today + timedelta(days=i) for i in range(days)],
+                             lang=lang, units=units, priority=priority)
@@ -0,0 +1,114 @@
+# services/forecast_cache.py
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from datetime import date
+
+logger = logging.getLogger(__name__)
+
+# Közös, tartós cache a bot, az API és a build között (SQLite, WAL mód).
+# Kulcs: (szolgáltató, változat, kvantált koordináta-cella, céldátum). A változat a választ befolyásoló
+# paraméterekből áll (OpenWeather: mértékegység + nyelv), hogy pl. egy imperial kérés °F értéke
+# ne kerüljön vissza egy metric hívónak.
+_DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "forecast.sqlite3")
+CACHE_PATH = os.getenv("FORECAST_CACHE_PATH", _DEFAULT_PATH)   # üres string → kikapcsolva
+CACHE_TTL_S = int(os.getenv("FORECAST_CACHE_TTL", "10800"))     # 3 óra
+CACHE_MAX_ROWS = int(os.getenv("FORECAST_CACHE_MAX_ROWS", "50000"))
+CELL_DEG = float(os.getenv("FORECAST_CACHE_CELL_DEG", "0.01"))  # ~1 km-es cellák
+
+_SCHEMA = """
+DROP TABLE IF EXISTS forecast_cache;
+CREATE TABLE IF NOT EXISTS forecast_cache_v2 (
+    provider   TEXT NOT NULL,
+    variant    TEXT NOT NULL,
+    cell       TEXT NOT NULL,
+    target     TEXT NOT NULL,
+    payload    TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (provider, variant, cell, target)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS forecast_cache_v2_expires ON forecast_cache_v2 (expires_at);
+"""
+
+_local = threading.local()
+_puts = 0
+_puts_lock = threading.Lock()
+_EVICT_EVERY = 200
+
+
+def _conn() -> sqlite3.Connection | None:
+    """Szálanként saját kapcsolat (sqlite3 kapcsolat nem osztható szálak között)."""
+    if not CACHE_PATH:
+        return None
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(CACHE_PATH) or ".", exist_ok=True)
+        conn = sqlite3.connect(CACHE_PATH, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        conn.executescript(_SCHEMA)
+        _local.conn = conn
+    return conn
+
+
+def cell_of(lat: float, lon: float) -> str:
+    """Koordináta → rácscella azonosító (CELL_DEG felbontás)."""
+    return f"{round(float(lat) / CELL_DEG)}:{round(float(lon) / CELL_DEG)}"
+
+
+def get(provider: str, lat: float, lon: float, target: date, variant: str = "") -> dict | None:
+    """Érvényes (nem lejárt) bejegyzés vagy None. Cache-hiba soha nem akasztja meg a lekérést."""
+    try:
+        conn = _conn()
+        if conn is None:
+            return None
+        row = conn.execute(
+            "SELECT payload FROM forecast_cache_v2 "
+            "WHERE provider=? AND variant=? AND cell=? AND target=? AND expires_at > ?;",
+            (provider, variant, cell_of(lat, lon), target.isoformat(), time.time()),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+    except Exception as e:
+        logger.warning("forecast_cache.get hiba: %s", e)
+        return None
+
+
+def put(provider: str, lat: float, lon: float, target: date, payload: dict, ttl_s: int | None = None,
+        variant: str = "") -> None:
+    global _puts
+    try:
+        conn = _conn()
+        if conn is None:
+            return
+        conn.execute(
+            "INSERT OR REPLACE INTO forecast_cache_v2 (provider, variant, cell, target, payload, expires_at) "
+            "VALUES (?, ?, ?, ?, ?, ?);",
+            (provider, variant, cell_of(lat, lon), target.isoformat(), json.dumps(payload, ensure_ascii=False),
+             time.time() + (CACHE_TTL_S if ttl_s is None else ttl_s)),
+        )
+        with _puts_lock:
+            _puts += 1
+            due = _puts % _EVICT_EVERY == 0
+        if due:
+            evict()
+    except Exception as e:
+        logger.warning("forecast_cache.put hiba: %s", e)
+
+
+def evict() -> None:
+    """Lejárt bejegyzések törlése, majd méretkorlát: a legkorábban lejárók mennek először."""
+    conn = _conn()
+    if conn is None:
+        return
+    conn.execute("DELETE FROM forecast_cache_v2 WHERE expires_at <= ?;", (time.time(),))
+    (count,) = conn.execute("SELECT COUNT(*) FROM forecast_cache_v2;").fetchone()
+    if count > CACHE_MAX_ROWS:
+        conn.execute(
+            "DELETE FROM forecast_cache_v2 WHERE (provider, variant, cell, target) IN ("
+            "  SELECT provider, variant, cell, target FROM forecast_cache_v2 ORDER BY expires_at LIMIT ?"
+            ");",
+            (count - CACHE_MAX_ROWS,),
+        )
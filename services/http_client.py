@@ -0,0 +1,213 @@
+# services/http_client.py
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Hostonként egy keep-alive session, állítható pool-méretekkel
+POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "4"))
+POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))
+
+# Újrapróbálás 429/5xx-re: exponenciális backoff teljes jitterrel, Retry-After tiszteletben tartva
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+BACKOFF_BASE_S = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX_S = float(os.getenv("HTTP_BACKOFF_MAX", "30"))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Alapból csak idempotens kérést ismétlünk: egy 5xx-re/megszakadt kapcsolatra ismételt POST
+# (pl. Telegram sendMessage) duplikált üzenetet küldhet. Más metódusnál a hívó kérhet retries=-t.
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+_sessions: dict[str, requests.Session] = {}
+_async_clients: dict[tuple[int, str], "httpx.AsyncClient"] = {}
+_stats: dict[str, dict] = {}
+_lock = threading.Lock()
+
+
+def _session(host: str) -> requests.Session:
+    with _lock:
+        s = _sessions.get(host)
+        if s is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            _sessions[host] = s
+        return s
+
+
+def _record(host: str, elapsed_ms: float, *, error: bool = False, retry: bool = False) -> None:
+    with _lock:
+        st = _stats.setdefault(host, {"requests": 0, "errors": 0, "retries": 0, "total_ms": 0.0, "max_ms": 0.0})
+        st["requests"] += 1
+        st["total_ms"] += elapsed_ms
+        st["max_ms"] = max(st["max_ms"], elapsed_ms)
+        if error:
+            st["errors"] += 1
+        if retry:
+            st["retries"] += 1
+
+
+def host_stats() -> dict[str, dict]:
+    """Hostonkénti késleltetés-számlálók (kérések, hibák, újrapróbálások, átlag/max ms)."""
+    with _lock:
+        out = {}
+        for host, st in _stats.items():
+            avg = st["total_ms"] / st["requests"] if st["requests"] else 0.0
+            out[host] = {**st, "total_ms": round(st["total_ms"], 1), "max_ms": round(st["max_ms"], 1),
+                         "avg_ms": round(avg, 1)}
+        return out
+
+
+def _retry_after_s(resp) -> float | None:
+    """Retry-After fejléc: másodpercek vagy HTTP-dátum."""
+    val = resp.headers.get("Retry-After")
+    if not val:
+        return None
+    try:
+        return max(0.0, float(val))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(val) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def _default_retries(method: str) -> int:
+    return MAX_RETRIES if method.upper() in IDEMPOTENT_METHODS else 0
+
+
+def _backoff_s(attempt: int) -> float:
+    return random.uniform(0, min(BACKOFF_MAX_S, BACKOFF_BASE_S * (2 ** attempt)))
+
+
+def request(method: str, url: str, *, retries: int | None = None, **kwargs) -> requests.Response:
+    """
+    HTTP kérés a hosthoz tartozó pool-olt sessionnel.
+    429/5xx és kapcsolódási hiba esetén újrapróbál (alapból csak idempotens metódusnál,
+    lásd IDEMPOTENT_METHODS); az utolsó választ adja vissza
+    (a raise_for_status() a hívó dolga), kapcsolódási hibánál a kivételt dobja tovább.
+    """
+    host = urlsplit(url).netloc
+    sess = _session(host)
+    retries = _default_retries(method) if retries is None else retries
+
+    attempt = 0
+    while True:
+        t0 = time.perf_counter()
+        try:
+            resp = sess.request(method, url, **kwargs)
+        except requests.ConnectionError:
+            _record(host, (time.perf_counter() - t0) * 1000, error=True, retry=attempt < retries)
+            if attempt >= retries:
+                raise
+            time.sleep(_backoff_s(attempt))
+            attempt += 1
+            continue
+
+        retryable = resp.status_code in RETRY_STATUSES
+        _record(host, (time.perf_counter() - t0) * 1000,
+                error=resp.status_code >= 400, retry=retryable and attempt < retries)
+        if not retryable or attempt >= retries:
+            return resp
+
+        wait = _retry_after_s(resp)
+        if wait is None:
+            wait = _backoff_s(attempt)
+        wait = min(wait, BACKOFF_MAX_S)
+        logger.warning("HTTP %s %s → %s, újrapróbálás %.1f mp múlva (%d/%d)",
+                       method, host, resp.status_code, wait, attempt + 1, retries)
+        time.sleep(wait)
+        attempt += 1
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+# ---- async változat (bot): hostonként és event loop-onként egy httpx.AsyncClient ----
+
+def _async_client(host: str):
+    import httpx  # csak az async út igényli (a bot úgyis hozza a python-telegram-bot-tal)
+
+    key = (id(asyncio.get_running_loop()), host)
+    with _lock:
+        c = _async_clients.get(key)
+        if c is None:
+            c = httpx.AsyncClient(limits=httpx.Limits(
+                max_connections=POOL_MAXSIZE, max_keepalive_connections=POOL_CONNECTIONS,
+            ))
+            _async_clients[key] = c
+        return c
+
+
+async def arequest(method: str, url: str, *, retries: int | None = None, **kwargs):
+    """
+    A request() async párja ugyanazzal az újrapróbálási politikával és számlálókkal.
+    A `timeout` kulcsszó másodpercben értendő, mint a requests-nél.
+    """
+    import httpx
+
+    host = urlsplit(url).netloc
+    client = _async_client(host)
+    retries = _default_retries(method) if retries is None else retries
+
+    attempt = 0
+    while True:
+        t0 = time.perf_counter()
+        try:
+            resp = await client.request(method, url, **kwargs)
+        except httpx.TransportError:
+            _record(host, (time.perf_counter() - t0) * 1000, error=True, retry=attempt < retries)
+            if attempt >= retries:
+                raise
+            await asyncio.sleep(_backoff_s(attempt))
+            attempt += 1
+            continue
+
+        retryable = resp.status_code in RETRY_STATUSES
+        _record(host, (time.perf_counter() - t0) * 1000,
+                error=resp.status_code >= 400, retry=retryable and attempt < retries)
+        if not retryable or attempt >= retries:
+            return resp
+
+        wait = _retry_after_s(resp)
+        if wait is None:
+            wait = _backoff_s(attempt)
+        wait = min(wait, BACKOFF_MAX_S)
+        logger.warning("HTTP %s %s → %s, újrapróbálás %.1f mp múlva (%d/%d)",
+                       method, host, resp.status_code, wait, attempt + 1, retries)
+        await asyncio.sleep(wait)
+        attempt += 1
+
+
+async def aget(url: str, **kwargs):
+    return await arequest("GET", url, **kwargs)
+
+
+async def apost(url: str, **kwargs):
+    return await arequest("POST", url, **kwargs)
+
+
+async def aclose() -> None:
+    """Az aktuális event loop async klienseinek lezárása (leállításkor)."""
+    loop_id = id(asyncio.get_running_loop())
+    with _lock:
+        mine = [k for k in _async_clients if k[0] == loop_id]
+        clients = [_async_clients.pop(k) for k in mine]
+    for c in clients:
+        await c.aclose()
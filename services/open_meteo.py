@@ -1,26 +1,114 @@
 # services/open_meteo.py
-import requests
+import os
+
+from services import http_client
+
+BASE_URL = "https://api.open-meteo.com/v1/forecast"
+DAILY_VARS = "temperature_2m_max,temperature_2m_min,precipitation_sum,windspeed_10m_max"
+
+# Batch-lekérés korlátai: egy URL ne legyen túl hosszú, és egy kérésben se legyen túl sok pont
+MAX_URL_LEN = int(os.getenv("OPEN_METEO_MAX_URL_LEN", "2000"))
+MAX_BATCH = int(os.getenv("OPEN_METEO_MAX_BATCH", "100"))
+
+
+def _build_url(lats: list[str], lons: list[str]) -> str:
+    return (
+        f"{BASE_URL}"
+        f"?latitude={','.join(lats)}&longitude={','.join(lons)}"
+        f"&daily={DAILY_VARS}"
+        "&timezone=Europe/Budapest"
+    )
+
+
+def _parse_series(daily: dict) -> list[dict]:
+    """
+    A teljes napi sor kompakt, naponkénti formában (index 0 = ma, 1 = holnap, ...).
+    Ahol a modell már nem ad hőmérsékletet (a horizont vége), ott a sor véget ér.
+    """
+    days = []
+    for i, day in enumerate(daily["time"]):
+        tmax, tmin = daily["temperature_2m_max"][i], daily["temperature_2m_min"][i]
+        if tmax is None or tmin is None:
+            break
+        days.append({
+            "date": day,
+            "tmax": float(tmax),
+            "tmin": float(tmin),
+            "precip_mm": float(daily["precipitation_sum"][i] or 0.0),
+            "wind_max": float(daily["windspeed_10m_max"][i] or 0.0),
+        })
+    return days
+
+
+def get_open_meteo_series(lat: float, lon: float, *, lang: str = "hu") -> list[dict]:
+    """
+    Open-Meteo napi előrejelzés a teljes (7 napos) sorral.
+    Visszatérés: [{"date": "YYYY-MM-DD", "tmax", "tmin", "precip_mm", "wind_max"}, ...]
+    """
+    url = _build_url([str(lat)], [str(lon)])
+    r = http_client.get(url, timeout=20)
+    r.raise_for_status()
+    return _parse_series(r.json()["daily"])
+
+
+async def aget_open_meteo_series(lat: float, lon: float, *, lang: str = "hu") -> list[dict]:
+    """A get_open_meteo_series() async (nem blokkoló) párja a bothoz."""
+    url = _build_url([str(lat)], [str(lon)])
+    r = await http_client.aget(url, timeout=20)
+    r.raise_for_status()
+    return _parse_series(r.json()["daily"])
 
 
 def get_open_meteo_daily(lat: float, lon: float, *, lang: str = "hu") -> dict:
     """
     Open-Meteo napi előrejelzés (holnapi index = 1).
     Hozzuk: tmax, tmin, csapadék (összeg), szél (napi max 10 m-en).
-    Visszatérés: {"tmax": float, "tmin": float, "precip_mm": float, "wind_max": float}
+    Visszatérés: {"date": str, "tmax": float, "tmin": float, "precip_mm": float, "wind_max": float}
     """
-    url = (
-        "https://api.open-meteo.com/v1/forecast"
-        f"?latitude={lat}&longitude={lon}"
-        "&daily=temperature_2m_max,temperature_2m_min,precipitation_sum,windspeed_10m_max"
-        "&timezone=Europe/Budapest"
-    )
-    r = requests.get(url, timeout=20)
-    r.raise_for_status()
-    daily = r.json()["daily"]
-
-    return {
-        "tmax": float(daily["temperature_2m_max"][1]),
-        "tmin": float(daily["temperature_2m_min"][1]),
-        "precip_mm": float(daily["precipitation_sum"][1]),
-        "wind_max": float(daily["windspeed_10m_max"][1]),
-    }
+    return get_open_meteo_series(lat, lon, lang=lang)[1]
+
+
+def _split_batches(coords: list[tuple[float, float]]) -> list[list[tuple[float, float]]]:
+    """
+    Koordináták szétosztása kérésekre: egy batch URL-je legfeljebb MAX_URL_LEN hosszú,
+    és legfeljebb MAX_BATCH pontot tartalmaz.
+    """
+    batches: list[list[tuple[float, float]]] = []
+    cur: list[tuple[float, float]] = []
+    lats: list[str] = []
+    lons: list[str] = []
+    for lat, lon in coords:
+        lats.append(str(lat)); lons.append(str(lon))
+        if cur and (len(cur) >= MAX_BATCH or len(_build_url(lats, lons)) > MAX_URL_LEN):
+            batches.append(cur)
+            cur, lats, lons = [], [str(lat)], [str(lon)]
+        cur.append((lat, lon))
+    if cur:
+        batches.append(cur)
+    return batches
+
+
+def get_open_meteo_series_many(coords: list[tuple[float, float]], *, lang: str = "hu") -> list[list[dict]]:
+    """
+    Több pont lekérése kevés HTTP-kéréssel (Open-Meteo vesszővel elválasztott koordinátái).
+    Bemenet: [(lat, lon), ...]
+    Visszatérés: a bemenettel azonos sorrendű lista, elemei a get_open_meteo_series() sorai.
+    """
+    coords = [(float(lat), float(lon)) for lat, lon in coords]
+    out: list[list[dict]] = []
+    for batch in _split_batches(coords):
+        url = _build_url([str(lat) for lat, _ in batch], [str(lon) for _, lon in batch])
+        r = http_client.get(url, timeout=20)
+        r.raise_for_status()
+        js = r.json()
+        # egy pontnál az API objektumot ad vissza, többnél listát
+        items = js if isinstance(js, list) else [js]
+        if len(items) != len(batch):
+            raise RuntimeError(f"Open-Meteo batch: {len(batch)} pontot kértünk, {len(items)} jött vissza.")
+        out.extend(_parse_series(it["daily"]) for it in items)
+    return out
+
+
+def get_open_meteo_daily_many(coords: list[tuple[float, float]], *, lang: str = "hu") -> list[dict]:
+    """Mint a get_open_meteo_series_many(), de pontonként csak a holnapi nap (ugyanaz a dict, mint a get_open_meteo_daily()-é)."""
+    return [series[1] for series in get_open_meteo_series_many(coords, lang=lang)]
@@ -1,55 +1,96 @@
 # services/openweather.py
 import os
-import requests
+from datetime import datetime, timezone
+
+from services import http_client
 
 
 class OpenWeatherError(RuntimeError):
     pass
 
 
-def get_openweather_daily(lat: float, lon: float, *, units: str = "metric", lang: str = "hu") -> dict:
+def _day_of(ts: int, tz_offset: int) -> str:
+    """Unix idő → helyi dátum (az API timezone_offset-je alapján)."""
+    return datetime.fromtimestamp(int(ts) + int(tz_offset), tz=timezone.utc).date().isoformat()
+
+
+def _parse_series(js: dict) -> list[dict]:
     """
-    OpenWeather One Call 3.0 – napi (holnapi index = 1).
-    Hozzuk: tmax, tmin, csapadék (rain+snow), szél (wind_speed), és ha van: alerts.
-    Visszatérés:
-      {
-        "tmax": float, "tmin": float, "precip_mm": float, "wind_max": float,
-        "alerts": [ {"event": str, "sender": str} , ... ]  # ha van
-      }
+    A teljes napi sor kompakt, naponkénti formában (index 0 = ma, 1 = holnap, ...).
+    A riasztások ahhoz a naphoz kerülnek, amelyikkel az érvényességük átfed.
     """
+    tz_offset = js.get("timezone_offset", 0)
+    alerts = js.get("alerts", []) or []
+
+    days = []
+    for d in js["daily"]:
+        day = _day_of(d["dt"], tz_offset)
+        alerts_list = []
+        for a in alerts:
+            start = _day_of(a.get("start", d["dt"]), tz_offset)
+            end = _day_of(a.get("end", d["dt"]), tz_offset)
+            if start <= day <= end:
+                alerts_list.append({
+                    "event": a.get("event") or "Riasztás",
+                    "sender": a.get("sender_name") or "",
+                })
+        days.append({
+            "date": day,
+            "tmax": float(d["temp"]["max"]),
+            "tmin": float(d["temp"]["min"]),
+            "precip_mm": float(d.get("rain", 0.0)) + float(d.get("snow", 0.0)),
+            "wind_max": float(d.get("wind_speed", 0.0)),
+            "alerts": alerts_list,
+        })
+    return days
+
+
+def _build_url(lat: float, lon: float, units: str, lang: str) -> str:
     api_key = os.getenv("OPENWEATHER_API_KEY")
     if not api_key:
         raise OpenWeatherError("OPENWEATHER_API_KEY nincs beállítva (.env)!")
 
     # alerts benne marad – csak minutely,hourly,current exclude
-    url = (
+    return (
         "https://api.openweathermap.org/data/3.0/onecall"
         f"?lat={lat}&lon={lon}"
         "&exclude=minutely,hourly,current"
         f"&units={units}&lang={lang}&appid={api_key}"
     )
-    r = requests.get(url, timeout=25)
+
+
+def _parse_response(r) -> list[dict]:
     if r.status_code == 401:
         raise OpenWeatherError("OpenWeather 401 – rossz/hiányzó API kulcs.")
     r.raise_for_status()
-    js = r.json()
-
-    d = js["daily"][1]
-    precip = float(d.get("rain", 0.0)) + float(d.get("snow", 0.0))
-    wind = float(d.get("wind_speed", 0.0))
-
-    # alerts (ha jön)
-    alerts_list = []
-    for a in js.get("alerts", []) or []:
-        alerts_list.append({
-            "event": a.get("event") or "Riasztás",
-            "sender": a.get("sender_name") or "",
-        })
+    return _parse_series(r.json())
 
-    return {
-        "tmax": float(d["temp"]["max"]),
-        "tmin": float(d["temp"]["min"]),
-        "precip_mm": precip,
-        "wind_max": wind,
-        "alerts": alerts_list,
-    }
+
+def get_openweather_series(lat: float, lon: float, *, units: str = "metric", lang: str = "hu") -> list[dict]:
+    """
+    OpenWeather One Call 3.0 – a teljes (8 napos) napi sor egyetlen hívásból.
+    Visszatérés: [{"date": "YYYY-MM-DD", "tmax", "tmin", "precip_mm", "wind_max", "alerts": [...]}, ...]
+    Nincs újrapróbálás: minden hívás fizetős és egy ow_quota-foglalás egy hívást fed le;
+    a hibát a circuit breaker számolja, a hiányzó pontot az Open-Meteo pótolja.
+    """
+    r = http_client.get(_build_url(lat, lon, units, lang), timeout=25, retries=0)
+    return _parse_response(r)
+
+
+async def aget_openweather_series(lat: float, lon: float, *, units: str = "metric", lang: str = "hu") -> list[dict]:
+    """A get_openweather_series() async (nem blokkoló) párja a bothoz."""
+    r = await http_client.aget(_build_url(lat, lon, units, lang), timeout=25, retries=0)
+    return _parse_response(r)
+
+
+def get_openweather_daily(lat: float, lon: float, *, units: str = "metric", lang: str = "hu") -> dict:
+    """
+    OpenWeather One Call 3.0 – napi (holnapi index = 1).
+    Hozzuk: tmax, tmin, csapadék (rain+snow), szél (wind_speed), és ha van: alerts.
+    Visszatérés:
+      {
+        "date": str, "tmax": float, "tmin": float, "precip_mm": float, "wind_max": float,
+        "alerts": [ {"event": str, "sender": str} , ... ]  # ha van
+      }
+    """
+    return get_openweather_series(lat, lon, units=units, lang=lang)[1]
@@ -0,0 +1,125 @@
+# services/ow_quota.py
+import os
+import json
+import fcntl
+import logging
+from datetime import datetime, timezone
+
+from services.openweather import OpenWeatherError
+from services.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# OpenWeather One Call 3.0 hívásonként számláz – egy kulcs, közös napi keret (UTC nap)
+OW_DAILY_LIMIT = int(os.getenv("OW_DAILY_LIMIT", "1000"))
+OW_RATE_PER_S = float(os.getenv("OW_RATE_PER_S", "10"))
+OW_BURST = float(os.getenv("OW_BURST", "10"))
+_DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "ow_quota.json")
+OW_QUOTA_PATH = os.getenv("OW_QUOTA_PATH", _DEFAULT_PATH)
+
+# Prioritás: megyeszékhely > nagyobb település > minden más.
+# Az alacsonyabb szintek csak addig kapnak OW-t, amíg a maradék keret a küszöbük fölött van.
+PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW = 2, 1, 0
+OW_PRIORITY_MIN_POP = int(os.getenv("OW_PRIORITY_MIN_POP", "50000"))
+_FLOOR_SHARE = {
+    PRIORITY_HIGH: 0.0,
+    PRIORITY_NORMAL: float(os.getenv("OW_NORMAL_FLOOR", "0.10")),
+    PRIORITY_LOW: float(os.getenv("OW_LOW_FLOOR", "0.30")),
+}
+
+
+class OpenWeatherQuotaError(OpenWeatherError):
+    """Elfogyott (vagy az adott prioritásnak már nem jár) az OW napi keret."""
+
+
+def priority_of(city: dict | None) -> int:
+    """Város dict (db_utils: is_county_seat, population) → prioritás."""
+    if not city:
+        return PRIORITY_NORMAL
+    if city.get("is_county_seat"):
+        return PRIORITY_HIGH
+    if (city.get("population") or 0) >= OW_PRIORITY_MIN_POP:
+        return PRIORITY_NORMAL
+    return PRIORITY_LOW
+
+
+def _today() -> str:
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def _update(fn):
+    """Fájlzáras olvasás-módosítás-írás: a bot, az API és a build ugyanazt a számlálót látja."""
+    os.makedirs(os.path.dirname(OW_QUOTA_PATH) or ".", exist_ok=True)
+    with open(OW_QUOTA_PATH, "a+", encoding="utf-8") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            f.seek(0)
+            raw = f.read()
+            try:
+                state = json.loads(raw) if raw.strip() else {}
+            except ValueError:
+                state = {}
+            if state.get("day") != _today():
+                state = {"day": _today(), "used": 0}
+            result = fn(state)
+            f.seek(0)
+            f.truncate()
+            json.dump(state, f)
+            f.flush()  # a zár feloldása előtt kerüljön a fájlba
+            return result
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def used_today() -> int:
+    return _update(lambda st: st["used"])
+
+
+def remaining() -> int:
+    return max(0, OW_DAILY_LIMIT - used_today())
+
+
+def try_reserve(priority: int = PRIORITY_NORMAL) -> bool:
+    """
+    Egy hívás lefoglalása a napi keretből, ha a prioritás küszöbe még engedi.
+    Cache-találat nem fogyaszt keretet – ezt csak tényleges hívás előtt kell meghívni.
+    """
+    floor = int(OW_DAILY_LIMIT * _FLOOR_SHARE.get(priority, _FLOOR_SHARE[PRIORITY_LOW]))
+
+    def _take(st):
+        if OW_DAILY_LIMIT - st["used"] - 1 < floor:
+            return False
+        st["used"] += 1
+        return True
+
+    try:
+        ok = _update(_take)
+    except OSError as e:
+        # ha a számlálófájl nem elérhető, ne álljon le a lekérés
+        logger.warning("ow_quota: számlálófájl hiba, keret nélkül megyünk tovább: %s", e)
+        return True
+    if not ok:
+        logger.info("ow_quota: keret elfogyott a(z) %s prioritásnak – csak Open-Meteo", priority)
+    return ok
+
+
+def refund() -> None:
+    """Lefoglalt, de végül el nem indított hívás visszaadása (pl. nyitott circuit breaker)."""
+    def _give(st):
+        st["used"] = max(0, st["used"] - 1)
+    try:
+        _update(_give)
+    except OSError as e:
+        logger.warning("ow_quota: számlálófájl hiba (refund): %s", e)
+
+
+# Folyamaton belüli sebességkorlát (a szálak közösen osztoznak rajta)
+_bucket = TokenBucket(OW_RATE_PER_S, OW_BURST)
+
+
+def wait_for_slot() -> None:
+    _bucket.take()
+
+
+async def wait_for_slot_async() -> None:
+    await _bucket.take_async()
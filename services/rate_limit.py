@@ -0,0 +1,140 @@
+# services/rate_limit.py
+import os
+import json
+import time
+import fcntl
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Szálbiztos token bucket: `rate` token/mp utántöltés, legfeljebb `burst` token tárolható.
+    """
+
+    def __init__(self, rate: float, burst: float | None = None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def pause(self, seconds: float) -> None:
+        """Az egész bucket szüneteltetése (pl. a szolgáltató Retry-After jelzése után), utána üresen indul."""
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + seconds)
+            self._tokens = 0.0
+            self._updated = self._paused_until
+
+    def try_take(self, n: float = 1.0) -> bool:
+        return self._take_or_wait(n) == 0.0
+
+    def _take_or_wait(self, n: float) -> float:
+        """Ha van elég token, elveszi és 0-t ad; különben a szükséges várakozás (mp)."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            self._refill(now)
+            if self._tokens >= n:
+                self._tokens -= n
+                return 0.0
+            return (n - self._tokens) / self.rate
+
+    async def take_async(self, n: float = 1.0) -> None:
+        """A take() event loop-barát párja (asyncio.sleep-pel vár)."""
+        while True:
+            wait = self._take_or_wait(n)
+            if wait == 0.0:
+                return
+            await asyncio.sleep(wait)
+
+    def take(self, n: float = 1.0, timeout: float | None = None) -> bool:
+        """Blokkol, amíg van elég token (vagy lejár a timeout → False)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._take_or_wait(n)
+            if wait == 0.0:
+                return True
+            if deadline is not None:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return False
+                wait = min(wait, left)
+            time.sleep(wait)
+
+
+class SharedTokenBucket(TokenBucket):
+    """
+    Több folyamat közös token bucketje: az állapot (tokenek, utolsó frissítés, szünet vége) egy
+    fájlzárral védett JSON-ban van, mint az ow_quota számlálója, így a párhuzamos folyamatok
+    együtt tartják a `rate` korlátot. Falióra-időt használ, mert a monotonic óra folyamatonként más.
+    """
+
+    def __init__(self, path: str, rate: float, burst: float | None = None):
+        super().__init__(rate, burst)
+        self.path = path
+
+    def _update(self, fn):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a+", encoding="utf-8") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                raw = f.read()
+                try:
+                    state = json.loads(raw) if raw.strip() else {}
+                except ValueError:
+                    state = {}
+                result = fn(state)
+                f.seek(0)
+                f.truncate()
+                json.dump(state, f)
+                f.flush()  # a zár feloldása előtt kerüljön a fájlba
+                return result
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _take_or_wait(self, n: float) -> float:
+        def _take(st):
+            now = time.time()
+            paused_until = st.get("paused_until", 0.0)
+            if now < paused_until:
+                return paused_until - now
+            updated = min(st.get("updated", now), now)
+            tokens = min(self.capacity, st.get("tokens", self.capacity) + (now - updated) * self.rate)
+            st["updated"] = now
+            if tokens >= n:
+                st["tokens"] = tokens - n
+                return 0.0
+            st["tokens"] = tokens
+            return (n - tokens) / self.rate
+
+        try:
+            return self._update(_take)
+        except OSError as e:
+            # ha az állapotfájl nem elérhető, a folyamat a saját (helyi) keretével megy tovább
+            logger.warning("rate_limit: közös állapotfájl hiba, helyi bucket: %s", e)
+            return super()._take_or_wait(n)
+
+    def pause(self, seconds: float) -> None:
+        def _pause(st):
+            until = max(st.get("paused_until", 0.0), time.time() + seconds)
+            st["paused_until"] = until
+            st["tokens"] = 0.0
+            st["updated"] = until
+
+        try:
+            self._update(_pause)
+        except OSError as e:
+            logger.warning("rate_limit: közös állapotfájl hiba (pause): %s", e)
+        super().pause(seconds)
@@ -0,0 +1,76 @@
+# services/singleflight.py
+import asyncio
+import threading
+from concurrent.futures import CancelledError, Future
+from typing import Awaitable, Callable, Hashable
+
+
+class Group:
+    """
+    Szálas single-flight: azonos kulcsra egyszerre csak egy lekérés fut,
+    a közben érkező hívók ugyanazt a Future-t kapják meg.
+    """
+
+    def __init__(self):
+        self._inflight: dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key: Hashable, start: Callable[[], Future]) -> Future:
+        """
+        `start()` csak akkor fut, ha a kulcsra még nincs folyamatban lévő lekérés.
+        A zár alatt csak egy helyőrző Future kerül be; a `start()` (pl. OW-kvóta: fájlzár + JSON)
+        már a záron kívül fut, így a többi kulcs hívói nem várnak rá.
+        """
+        with self._lock:
+            fut = self._inflight.get(key)
+            if fut is not None:
+                return fut
+            fut = Future()
+            fut.set_running_or_notify_cancel()  # egy váró hívó cancel()-je ne szakítsa meg a közös lekérést
+            self._inflight[key] = fut
+        fut.add_done_callback(lambda f: self._forget(key, f))
+        try:
+            inner = start()
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        # azonnal kész (pl. kvóta-hiba) esetén a callback rögtön lefut: a helyőrző kikerül és hibával zárul
+        inner.add_done_callback(lambda f: _chain(f, fut))
+        return fut
+
+    def _forget(self, key: Hashable, fut: Future) -> None:
+        with self._lock:
+            if self._inflight.get(key) is fut:
+                del self._inflight[key]
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+
+def _chain(src: Future, dst: Future) -> None:
+    if src.cancelled():
+        dst.set_exception(CancelledError())  # a helyőrző RUNNING állapotú, cancel()-lel nem zárható
+    elif src.exception() is not None:
+        dst.set_exception(src.exception())
+    else:
+        dst.set_result(src.result())
+
+
+class AsyncGroup:
+    """Az asyncio párja: azonos kulcsra egy Task fut, a többi hívó annak eredményére vár."""
+
+    def __init__(self):
+        self._inflight: dict[tuple[int, Hashable], asyncio.Task] = {}
+
+    async def do(self, key: Hashable, start: Callable[[], Awaitable]):
+        k = (id(asyncio.get_running_loop()), key)
+        task = self._inflight.get(k)
+        if task is None:
+            task = asyncio.ensure_future(start())
+            self._inflight[k] = task
+            task.add_done_callback(lambda t: self._inflight.pop(k, None) if self._inflight.get(k) is t else None)
+        # shield: ha egy váró hívót megszakítanak, a közös lekérés a többieknek tovább fut
+        return await asyncio.shield(task)
+
+    def __len__(self) -> int:
+        return len(self._inflight)
@@ -0,0 +1,118 @@
+# tests/test_pipeline.py
+import os
+import sys
+import json
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENWEATHER_API_KEY", "test")
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "1:test")
+os.environ.setdefault("TELEGRAM_CHAT_ID", "-1")
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/test")
+os.environ["FORECAST_CACHE_PATH"] = ""
+
+import pytest
+
+import build_articles
+import manifest
+import pipeline
+import run_daily
+import send_telegram
+from services import fetch_engine, ow_quota
+
+_publish = run_daily.publish  # a fixture lecseréli; a kiküldési teszt az eredetit hívja
+
+COUNTIES = {
+    "Zala": [{"city": "Zalaegerszeg", "lat": 46.84, "lon": 16.84, "slug": "zalaegerszeg",
+              "is_county_seat": True, "population": 56000}],
+}
+
+
+def _series(offset: float) -> list[dict]:
+    # napról napra más érték: tmax = a nap sorszáma (ma = 0) + offset
+    today = date.today()
+    return [{"date": (today + timedelta(days=i)).isoformat(), "tmax": float(i) + offset, "tmin": float(i) + offset,
+             "precip_mm": 0.0, "wind_max": 0.0} for i in range(8)]
+
+
+@pytest.fixture
+def fake_env(tmp_path, monkeypatch):
+    monkeypatch.setattr(build_articles, "OUTDIR", str(tmp_path))
+    monkeypatch.setattr(build_articles, "get_cities_grouped_by_county", lambda **kw: COUNTIES)
+    monkeypatch.setattr(build_articles, "get_cities_by_regions", lambda by_county, **kw: {})
+    monkeypatch.setattr(fetch_engine, "get_open_meteo_series_many", lambda batch, lang="hu": [_series(0.0) for _ in batch])
+    monkeypatch.setattr(fetch_engine, "get_openweather_series", lambda lat, lon, units="metric", lang="hu": _series(0.0))
+    monkeypatch.setattr(ow_quota, "OW_QUOTA_PATH", str(tmp_path / "quota.json"))
+    sent = []
+    monkeypatch.setattr(run_daily, "publish", lambda target, start=0, on_sent=None: sent.append(target) or 0)
+    return tmp_path, sent
+
+
+def test_date_other_than_tomorrow_uses_that_days_forecast(fake_env):
+    tmp_path, sent = fake_env
+    target = date.today() + timedelta(days=3)
+
+    assert pipeline.run(target.isoformat()) == 0
+
+    fetched = json.load(open(tmp_path / "pipeline" / target.isoformat() / "fetch.json", encoding="utf-8"))
+    assert fetched["target"] == target.isoformat()
+    [[_, _, con]] = fetched["points"]
+    assert con["tmax_c"] == 3.0  # a 3. nap értéke, nem a holnapi (1.0)
+
+    doc = json.load(open(tmp_path / f"manifest-{target.isoformat()}.json", encoding="utf-8"))
+    assert doc["date"] == target.isoformat()
+    county = next(m for m in doc["messages"] if m["kind"] == "county")
+    assert "3.0 °C" in county["tg_chunks"][0]
+    assert sent == [target.isoformat()]
+
+
+def test_invisible_float_difference_keeps_articles_unchanged(fake_env):
+    tmp_path, _ = fake_env
+    target = date.today() + timedelta(days=1)
+    agg = build_articles.aggregate_stage(build_articles.fetch_stage(target))
+    assert build_articles.render_stage(agg)["rendered"] > 0
+
+    # a megjelenített (1 tizedesre kerekített) értékek nem változnak → nincs újrarenderelés
+    for co in agg["counties"]:
+        co["agg"]["tmax_c"] += 1e-9
+        for r in co["rows"]:
+            r["cons_tmax"] += 1e-9
+    assert build_articles.render_stage(agg)["rendered"] == 0
+
+    agg["counties"][0]["agg"]["tmax_c"] += 1.0
+    assert build_articles.render_stage(agg)["rendered"] == 1
+
+
+def test_rebuild_does_not_lose_unpublished_changes(fake_env, monkeypatch):
+    tmp_path, _ = fake_env
+    monkeypatch.setattr(send_telegram, "OUTDIR", str(tmp_path))
+    posted = []
+    monkeypatch.setattr(run_daily, "send_text", lambda text, parse_mode=None: posted.append(text))
+    target = date.today() + timedelta(days=1)
+    agg = build_articles.aggregate_stage(build_articles.fetch_stage(target))
+
+    # első build, kiküldés a csatornára és a felhasználóknak
+    build_articles.render_stage(agg)
+    assert _publish(target.isoformat()) > 0
+    doc = manifest.load(str(tmp_path), target)
+    manifest.mark_published(str(tmp_path), target, send_telegram.publisher_name(None), doc["messages"])
+    posted.clear()
+
+    # napközbeni frissítés: a megye változik, majd még egy render változás nélkül (pl. --from-stage render)
+    agg["counties"][0]["agg"]["tmax_c"] += 1.0
+    assert build_articles.render_stage(agg)["rendered"] == 1
+    assert build_articles.render_stage(agg)["rendered"] == 0
+
+    # a második render nem nyelte el a változást: --changed-only csak a megyét küldi
+    doc = manifest.load(str(tmp_path), target)
+    published = manifest.load_published(str(tmp_path), target, send_telegram.publisher_name(None))
+    assert [m["kind"] for m in send_telegram.select_messages(doc, None, True, published)] == ["county"]
+
+    # a csatornára is csak a megye megy ki, egyszer
+    _publish(target.isoformat())
+    county = next(m for m in doc["messages"] if m["kind"] == "county")
+    assert county["md_chunks"][0] in posted
+    assert not any(m["md_chunks"][0] in posted for m in doc["messages"] if m["kind"] == "national")
+    posted.clear()
+    assert _publish(target.isoformat()) == 0
+    assert posted == []
@@ -0,0 +1,53 @@
+# tests/test_writer.py
+import os
+import sys
+import json
+import itertools
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import writer
+
+# A writer_golden.json a dokumentum-alapú render előtti make_* függvények kimenete (magyar).
+# Két szándékos eltérés van benne: a régi make_article "- - Szél" kettős felsorolásjele és
+# az országos cikk régiósoraiban a "|  - Szél" helyett egyszeres "- Szél" / "|  Szél" áll.
+GOLDEN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "writer_golden.json")
+
+TARGET = date(2026, 10, 19)
+ROWS = [{"city": "Zalaegerszeg", "cons_tmax": 14.26, "cons_tmin": 3.04, "cons_pr": 0.04},
+        {"city": "Nagykanizsa", "cons_tmax": 15.0, "cons_tmin": 4.55, "cons_pr": 2.35}]
+WINDS = [None, 10.0, 34.4, 34.6, 35.0, 51.7]
+ALERTS = {"none": None, "empty": [], "one": ["Viharos szél"], "dupes": ["b", " a ", "b"]}
+
+
+def cases():
+    """(név, függvény, argumentumok) – szél nélkül és széllel, riasztással és anélkül."""
+    for wind, (akey, alerts) in itertools.product(WINDS, ALERTS.items()):
+        daily = {"tmax_c": 14.6, "tmin_c": 3.8, "precip_mm": 2.35}
+        if wind is not None:
+            daily["wind_kmh"] = wind
+        regions = [("Nyugat-Dunántúl", {**daily, "cities": [{"city": "Zalaegerszeg", "tmax": 14.26, "tmin": 3.04, "pr": 0.04}]}),
+                   ("Alföld", {"tmax_c": 16.0, "tmin_c": 5.0, "precip_mm": 0.0, "cities": []})]
+        tag = f"wind={wind}|alerts={akey}"
+        yield f"make_article|{tag}", "make_article", ("Zala", ROWS, daily, alerts), {}
+        yield f"make_telegram|{tag}", "make_telegram", ("Zala", ROWS, daily, alerts), {"target": TARGET}
+        yield f"make_telegram_notarget|{tag}", "make_telegram", ("Zala", ROWS, daily, alerts), {}
+        yield f"make_national_article|{tag}", "make_national_article", (TARGET, daily, regions, alerts), {}
+        yield f"make_telegram_national|{tag}", "make_telegram_national", (TARGET, daily, regions, alerts), {}
+
+
+@pytest.fixture(scope="module")
+def golden():
+    with open(GOLDEN, encoding="utf-8") as f:
+        return json.load(f)
+
+
+CASES = list(cases())
+
+
+@pytest.mark.parametrize("name,fn,args,kwargs", CASES, ids=[c[0] for c in CASES])
+def test_make_output_matches_pre_render_writer(golden, name, fn, args, kwargs):
+    assert getattr(writer, fn)(*args, **kwargs) == golden[name]
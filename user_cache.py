@@ -0,0 +1,74 @@
+# user_cache.py
+import os
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+USER_CACHE_MAX = int(os.getenv("USER_CACHE_MAX", "10000"))
+USER_CACHE_TTL_S = float(os.getenv("USER_CACHE_TTL", "300"))
+
+
+class UserCache:
+    """
+    Korlátos méretű (LRU), TTL-es cache a telegram_users sorokra, user_id szerint.
+    - a sorokat csak cserélni szabad (put/update új dict-et tesz be), helyben módosítani nem,
+    - az updated_at "érintéseket" összegyűjti, a hívó időnként egy kötegben írja ki őket.
+    """
+
+    def __init__(self, max_size: int = USER_CACHE_MAX, ttl_s: float = USER_CACHE_TTL_S):
+        self.max_size = max_size
+        self.ttl_s = ttl_s
+        self._rows: OrderedDict[int, tuple[float, dict]] = OrderedDict()
+        self._touches: dict[int, datetime] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> dict | None:
+        with self._lock:
+            hit = self._rows.get(user_id)
+            if hit is None:
+                return None
+            expires, row = hit
+            if expires < time.monotonic():
+                del self._rows[user_id]
+                return None
+            self._rows.move_to_end(user_id)
+            return row
+
+    def put(self, user_id: int, row: dict) -> None:
+        with self._lock:
+            self._rows[user_id] = (time.monotonic() + self.ttl_s, dict(row))
+            self._rows.move_to_end(user_id)
+            while len(self._rows) > self.max_size:
+                self._rows.popitem(last=False)
+
+    def update(self, user_id: int, **fields) -> None:
+        """Mezők frissítése a cache-elt soron (ha benne van); a lejárati idő nem változik."""
+        with self._lock:
+            hit = self._rows.get(user_id)
+            if hit is not None:
+                self._rows[user_id] = (hit[0], {**hit[1], **fields})
+
+    def pop(self, user_id: int) -> None:
+        with self._lock:
+            self._rows.pop(user_id, None)
+            self._touches.pop(user_id, None)
+
+    def touch(self, user_id: int) -> None:
+        with self._lock:
+            self._touches[user_id] = datetime.now(timezone.utc)
+
+    def drain_touches(self) -> dict[int, datetime]:
+        with self._lock:
+            out, self._touches = self._touches, {}
+            return out
+
+    def requeue_touches(self, touches: dict[int, datetime]) -> None:
+        """Sikertelen kiírás után vissza; az újabb érintés marad, ha közben jött."""
+        with self._lock:
+            for uid, ts in touches.items():
+                if uid not in self._touches or self._touches[uid] < ts:
+                    self._touches[uid] = ts
+
+    def __len__(self) -> int:
+        return len(self._rows)
@@ -3,8 +3,20 @@ from __future__ import annotations
 from datetime import date
 import html, unicodedata
 
+# A sablonok verziója: a build ezzel együtt hasheli a bemenetet, így a változatlan megyéket nem írja újra.
+# Ha a kimenet szövege/formátuma változik, növeld – különben a régi cikkek maradnak.
+TEMPLATE_VERSION = 2
+
+LANGS = ("hu", "en", "ru")
+
 HU_WEEKDAYS = ["Hétfő", "Kedd", "Szerda", "Csütörtök", "Péntek", "Szombat", "Vasárnap"]
 
+WEEKDAYS = {
+    "hu": [d.lower() for d in HU_WEEKDAYS],
+    "en": ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"],
+    "ru": ["понедельник", "вторник", "среда", "четверг", "пятница", "суббота", "воскресенье"],
+}
+
 def _weekday_hu(d: date) -> str:
     return HU_WEEKDAYS[d.weekday()]
 
@@ -12,12 +24,18 @@ def _dow_and_date(d: date) -> str:
     # pl.: "hétfő, 2025-11-03"
     return f"{_weekday_hu(d).lower()}, {d.isoformat()}"
 
+def _num(x: float) -> str:
+    return f"{round(float(x), 1):.1f}"
+
+def _mm_num(x: float) -> str:
+    v = float(x)
+    return "0" if v < 0.05 else _num(v)
+
 def _deg(x: float) -> str:
-    return f"{round(float(x), 1):.1f} °C"
+    return f"{_num(x)} °C"
 
 def _mm(x: float) -> str:
-    v = float(x)
-    return "0 mm" if v < 0.05 else f"{round(v, 1):.1f} mm"
+    return f"{_mm_num(x)} mm"
 
 def _emoji_rain(mm: float) -> str:
     if mm >= 10: return "🌧️"
@@ -34,96 +52,327 @@ def _slugify(text: str) -> str:
         s = s.replace("--", "-")
     return s
 
+# ----- nyelvi szövegek -----
+# A számok nyelvfüggetlenek (a dokumentumban egyszer formázva), csak a mértékegység és a szöveg cserélődik.
+
+TEXTS = {
+    "hu": {
+        "county_q": "Milyen idő lesz holnap {name} vármegyében?",
+        "national_q": "Országos előrejelzés",
+        "county_lead": "{em} Napközben a maximum elérheti a {tmax} értéket, hajnalban {tmin} várható. "
+                       "Csapadék összességében {pr} körül valószínű a modellek szerint.",
+        "national_lead": "{em} Napközben országosan átlagosan {tmax}, hajnalban {tmin}. "
+                         "A csapadék összességében {pr} körül alakulhat.",
+        "lead_label": "Líd",
+        "county_summary": "Megyei összefoglaló:",
+        "national_summary": "Országos összefoglaló:",
+        "avg_max": "Átlagos csúcs",
+        "avg_min": "Átlagos minimum",
+        "precip_max": "Csapadék (maximum)",
+        "wind_calm": "Szél: jelentős szél nem várható",
+        "wind_gusts": "Szél: erősödő széllökések, max ~{v} km/h",
+        "no_alert": "Jelenleg nincs érvényben riasztás a holnapi napra.",
+        "alerts_head": "Riasztások:",
+        "alert_county": "Van érvényben riasztás.",
+        "cities_head": "{name} kiemelt települései holnapi várható időjárása:",
+        "city_line": "{city}: maximum/minimum {tmax} / {tmin}, eső {pr}",
+        "region_stats": "csúcs: {tmax}, min: {tmin}, csapadék (max): {pr}",
+        "region_city": "{city}: {tmax}/{tmin}, eső {pr}",
+        "sources": "Források: Open-Meteo, OpenWeather (One Call 3.0)",
+        "tg_high": "Átlag csúcs",
+        "tg_low": "min",
+        "tg_precip": "Csapadék (max)",
+        "tg_wind_calm": "Szél: jelentős nem várható",
+        "tg_wind": "Szél: max ~{v} km/h",
+        "tg_rain": "eső",
+        "tg_no_alert_county": "Nincs holnapi riasztás.",
+        "tg_alert_county": "Van érvényben riasztás.",
+        "tg_no_alert_national": "Nincs érvényes riasztás.",
+        "tg_alert_national": "Van érvényben riasztás (részletek a weben).",
+        "tg_sources_national": "Forrás: Open-Meteo, OpenWeather",
+        "mm": "mm",
+    },
+    "en": {
+        "county_q": "What will the weather be like tomorrow in {name} county?",
+        "national_q": "National forecast",
+        "county_lead": "{em} Daytime highs may reach {tmax}, with {tmin} expected around dawn. "
+                       "Models suggest about {pr} of precipitation overall.",
+        "national_lead": "{em} Nationwide highs average {tmax} during the day and {tmin} around dawn. "
+                         "Precipitation may total around {pr}.",
+        "lead_label": "Summary",
+        "county_summary": "County summary:",
+        "national_summary": "National summary:",
+        "avg_max": "Average high",
+        "avg_min": "Average low",
+        "precip_max": "Precipitation (maximum)",
+        "wind_calm": "Wind: no significant wind expected",
+        "wind_gusts": "Wind: strengthening gusts, up to ~{v} km/h",
+        "no_alert": "There are currently no warnings in effect for tomorrow.",
+        "alerts_head": "Warnings:",
+        "alert_county": "Warnings are in effect.",
+        "cities_head": "Tomorrow's expected weather in the main towns of {name}:",
+        "city_line": "{city}: high/low {tmax} / {tmin}, rain {pr}",
+        "region_stats": "high: {tmax}, low: {tmin}, precipitation (max): {pr}",
+        "region_city": "{city}: {tmax}/{tmin}, rain {pr}",
+        "sources": "Sources: Open-Meteo, OpenWeather (One Call 3.0)",
+        "tg_high": "Avg high",
+        "tg_low": "low",
+        "tg_precip": "Precipitation (max)",
+        "tg_wind_calm": "Wind: nothing significant",
+        "tg_wind": "Wind: up to ~{v} km/h",
+        "tg_rain": "rain",
+        "tg_no_alert_county": "No warnings for tomorrow.",
+        "tg_alert_county": "Warnings are in effect.",
+        "tg_no_alert_national": "No warnings in effect.",
+        "tg_alert_national": "Warnings are in effect (details on the web).",
+        "tg_sources_national": "Source: Open-Meteo, OpenWeather",
+        "mm": "mm",
+    },
+    "ru": {
+        "county_q": "Какая погода будет завтра в медье {name}?",
+        "national_q": "Прогноз по стране",
+        "county_lead": "{em} Днём максимум может достичь {tmax}, под утро ожидается {tmin}. "
+                       "По данным моделей, осадков в целом около {pr}.",
+        "national_lead": "{em} Днём в среднем по стране {tmax}, под утро {tmin}. "
+                         "Осадков в целом может выпасть около {pr}.",
+        "lead_label": "Кратко",
+        "county_summary": "Сводка по медье:",
+        "national_summary": "Сводка по стране:",
+        "avg_max": "Средний максимум",
+        "avg_min": "Средний минимум",
+        "precip_max": "Осадки (максимум)",
+        "wind_calm": "Ветер: сильного ветра не ожидается",
+        "wind_gusts": "Ветер: усиление порывов, до ~{v} км/ч",
+        "no_alert": "На завтра предупреждений нет.",
+        "alerts_head": "Предупреждения:",
+        "alert_county": "Действуют предупреждения.",
+        "cities_head": "Ожидаемая погода на завтра в основных городах медье {name}:",
+        "city_line": "{city}: максимум/минимум {tmax} / {tmin}, осадки {pr}",
+        "region_stats": "максимум: {tmax}, минимум: {tmin}, осадки (макс.): {pr}",
+        "region_city": "{city}: {tmax}/{tmin}, осадки {pr}",
+        "sources": "Источники: Open-Meteo, OpenWeather (One Call 3.0)",
+        "tg_high": "Средний максимум",
+        "tg_low": "минимум",
+        "tg_precip": "Осадки (макс.)",
+        "tg_wind_calm": "Ветер: без существенного усиления",
+        "tg_wind": "Ветер: до ~{v} км/ч",
+        "tg_rain": "осадки",
+        "tg_no_alert_county": "Предупреждений на завтра нет.",
+        "tg_alert_county": "Действуют предупреждения.",
+        "tg_no_alert_national": "Действующих предупреждений нет.",
+        "tg_alert_national": "Действуют предупреждения (подробности на сайте).",
+        "tg_sources_national": "Источник: Open-Meteo, OpenWeather",
+        "mm": "мм",
+    },
+}
+
+TELEGRAM_MAX = 3800
+
 # ----- közös meta -----
 
 def make_slug(megye: str, target: date) -> str:
     return f"milyen_idolesz_holnap-{_slugify(megye)}ben-{target.isoformat()}"
 
 def make_title(megye: str, target: date) -> str:
-    return f"Milyen idő lesz holnap {megye} vármegyében? – {_weekday_hu(target).lower()}, {target.isoformat()}"
+    return f"{TEXTS['hu']['county_q'].format(name=megye)} – {_dow_and_date(target)}"
 
 def make_lead(avg_tmax: float, avg_tmin: float, max_pr: float, city_names: list[str]) -> str:
-    em = _emoji_rain(float(max_pr))
-    return (
-        f"{em} Napközben a maximum elérheti a {_deg(avg_tmax)} értéket, hajnalban {_deg(avg_tmin)} várható. "
-        f"Csapadék összességében {_mm(max_pr)} körül valószínű a modellek szerint."
-    )
-
-# ----- országos blokk -----
+    return TEXTS["hu"]["county_lead"].format(em=_emoji_rain(float(max_pr)), tmax=_deg(avg_tmax),
+                                             tmin=_deg(avg_tmin), pr=_mm(max_pr))
 
 def make_national_slug(target: date) -> str:
     return f"000_orszagos-elorejelzes-{target.isoformat()}"
 
 def make_national_title(target: date) -> str:
-    return f"🌦️ Országos előrejelzés – {_weekday_hu(target).lower()}, {target.isoformat()}"
-
-def _maybe_wind_line(max_wind_kmh: float | None) -> str:
-    if max_wind_kmh is None:
-        return ""
-    v = round(float(max_wind_kmh))
-    if v < 35:
-        return "- Szél: jelentős szél nem várható\n"
-    return f"- Szél: erősödő széllökések, max ~{v} km/h\n"
-
-def _alerts_block(alerts: list[str] | None) -> str:
-    if alerts and any(a.strip() for a in alerts):
-        uniq = sorted({a.strip() for a in alerts if a.strip()})
-        return "🆘 Riasztások:\n" + "\n".join(f"- {a}" for a in uniq) + "\n\n"
-    return "🆘 Jelenleg nincs érvényben riasztás a holnapi napra.\n\n"
+    return f"🌦️ {TEXTS['hu']['national_q']} – {_dow_and_date(target)}"
+
+# ----- strukturált előrejelzés-dokumentum -----
+# A számokat itt formázzuk egyszer; a render() ebből állít elő minden kimenetet (md, txt, Telegram, HTML)
+# bármelyik nyelven. A dokumentum JSON-barát.
+
+def _alerts(alerts: list[str] | None) -> list[str]:
+    return sorted({a.strip() for a in alerts or [] if a.strip()})
+
+def _wind(daily: dict) -> int | None:
+    w = daily.get("wind_kmh")
+    return None if w is None else round(float(w))
+
+def _wind_strong(daily: dict) -> bool | None:
+    """A Telegram-szöveg küszöbe a kerekítetlen értéken (34.6 km/h még "nem jelentős"), mint korábban."""
+    w = daily.get("wind_kmh")
+    return None if w is None else float(w) >= 35
+
+def _values(daily: dict) -> dict:
+    return {"tmax": _num(daily["tmax_c"]), "tmin": _num(daily["tmin_c"]), "pr": _mm_num(daily["precip_mm"])}
+
+def county_doc(megye: str, per_city_rows: list[dict], daily: dict, alerts: list[str] | None = None,
+               target: date | None = None) -> dict:
+    """Megyei dokumentum; `per_city_rows`: {city, cons_tmax, cons_tmin, cons_pr}, `daily`: {tmax_c, tmin_c, precip_mm[, wind_kmh]}."""
+    return {
+        "kind": "county",
+        "name": megye,
+        "target": target.isoformat() if target else None,
+        "emoji": _emoji_rain(float(daily["precip_mm"])),
+        **_values(daily),
+        "wind": _wind(daily),
+        "wind_strong": _wind_strong(daily),
+        "alerts": _alerts(alerts),
+        "cities": [
+            {"city": r["city"], "tmax": _num(r["cons_tmax"]), "tmin": _num(r["cons_tmin"]), "pr": _mm_num(r["cons_pr"])}
+            for r in per_city_rows
+        ],
+    }
+
+def national_doc(target: date, country_daily: dict, regions_rows: list[tuple[str, dict]],
+                 alerts: list[str] | None = None) -> dict:
+    """Országos dokumentum; `regions_rows`: [(régió, {tmax_c, tmin_c, precip_mm, cities: [{city, tmax, tmin, pr}]})]."""
+    return {
+        "kind": "national",
+        "name": None,
+        "target": target.isoformat(),
+        "emoji": _emoji_rain(float(country_daily["precip_mm"])),
+        **_values(country_daily),
+        "wind": _wind(country_daily),
+        "wind_strong": _wind_strong(country_daily),
+        "alerts": _alerts(alerts),
+        "regions": [
+            {
+                "name": name,
+                **_values(reg),
+                "wind": _wind(reg),
+                "cities": [
+                    {"city": c["city"], "tmax": _num(c["tmax"]), "tmin": _num(c["tmin"]), "pr": _mm_num(c["pr"])}
+                    for c in reg.get("cities", [])
+                ],
+            }
+            for name, reg in regions_rows
+        ],
+    }
+
+# ----- renderelés -----
+
+def _ul_html(items: list[str], cls: str | None = None) -> str:
+    attr = f' class="{cls}"' if cls else ""
+    return f"<ul{attr}>\n" + "".join(f"<li>{_safe(x)}</li>\n" for x in items) + "</ul>\n"
+
+def render(doc: dict, lang: str = "hu") -> dict[str, str]:
+    """
+    Egy menetben minden kimenet: {"title", "lead", "body", "md", "txt", "telegram", "html"}.
+    A sorok szövege egyszer készül el, a formátumok ugyanazokból a sorokból épülnek.
+    A magyar md/txt/Telegram kimenet megegyezik a korábbi make_* függvényekével.
+    """
+    lang = lang if lang in TEXTS else "hu"
+    T = TEXTS[lang]
+    deg = lambda v: f"{v} °C"
+    mm = lambda v: f"{v} {T['mm']}"
+    county = doc["kind"] == "county"
+    target = date.fromisoformat(doc["target"]) if doc["target"] else None
+    when = f"{WEEKDAYS[lang][target.weekday()]}, {target.isoformat()}" if target else None
+
+    if county:
+        question = T["county_q"].format(name=doc["name"])
+        title = f"{question} – {when}" if when else question
+        tg_header = f"🌦️ {title}"
+    else:
+        title = f"🌦️ {T['national_q']} – {when}"
+        tg_header = title
+    vals = {"tmax": deg(doc["tmax"]), "tmin": deg(doc["tmin"]), "pr": mm(doc["pr"])}
+    lead = T["county_lead" if county else "national_lead"].format(em=doc["emoji"], **vals)
+
+    wind = doc["wind"]
+    summary = [f"{T['avg_max']}: {vals['tmax']}", f"{T['avg_min']}: {vals['tmin']}", f"{T['precip_max']}: {vals['pr']}"]
+    if wind is not None:
+        summary.append(T["wind_calm"] if wind < 35 else T["wind_gusts"].format(v=wind))
+    summary_head = T["county_summary" if county else "national_summary"]
+    alerts = doc["alerts"]
+
+    tg_summary = [
+        f"{T['tg_high']}: {vals['tmax']}{'  |  ' if county else ' | '}{T['tg_low']}: {vals['tmin']}",
+        f"{T['tg_precip']}: {vals['pr']}",
+    ]
+    if wind is not None:
+        # a cikk a kerekített értéket veti össze a küszöbbel, a Telegram-szöveg a nyerset (régi viselkedés)
+        tg_summary.append(T["tg_wind"].format(v=wind) if doc["wind_strong"] else T["tg_wind_calm"])
+    tg = f"{tg_header}\n" + "".join(f"• {x}\n" for x in tg_summary) + "\n"
+
+    parts_html = [f'<article lang="{lang}" class="forecast forecast-{doc["kind"]}">\n',
+                  f"<h1>{_safe(title)}</h1>\n", f'<p class="lead">{_safe(lead)}</p>\n',
+                  f"<h2>{_safe(summary_head.rstrip(':'))}</h2>\n", _ul_html(summary)]
+
+    if county:
+        alert_line = T["alert_county"] if alerts else T["no_alert"]
+        cities_head = T["cities_head"].format(name=doc["name"])
+        city_lines = [T["city_line"].format(city=c["city"], tmax=deg(c["tmax"]), tmin=deg(c["tmin"]), pr=mm(c["pr"]))
+                      for c in doc["cities"]]
+        body = (
+            f"{summary_head}\n\n" + "".join(f"- {x}\n" for x in summary) + "\n"
+            + f"🆘 {alert_line}\n\n"
+            + f"{cities_head}\n\n" + "".join(f"- {x}\n" for x in city_lines)
+            + f"\n{T['sources']}\n"
+        )
+        md = f"# {title}\n\n**{T['lead_label']}:** {lead}\n\n{body}\n"
+        txt = f"{title}\n\n{lead}\n\n{body}\n"
+
+        tg += "\n".join(f"🏙️ {c['city']}: {deg(c['tmax'])}/{deg(c['tmin'])}, {T['tg_rain']} {mm(c['pr'])}"
+                        for c in doc["cities"])
+        tg += f"\n\n🆘 {T['tg_alert_county'] if alerts else T['tg_no_alert_county']}\n{T['sources']}"
+
+        parts_html += [f'<p class="alerts">🆘 {_safe(alert_line)}</p>\n',
+                       f"<h2>{_safe(cities_head.rstrip(':'))}</h2>\n", _ul_html(city_lines)]
+    else:
+        if alerts:
+            alerts_md = f"🆘 {T['alerts_head']}\n" + "\n".join(f"- {a}" for a in alerts) + "\n\n"
+            parts_html += [f'<p class="alerts">🆘 {_safe(T["alerts_head"])}</p>\n', _ul_html(alerts, "alerts")]
+        else:
+            alerts_md = f"🆘 {T['no_alert']}\n\n"
+            parts_html.append(f'<p class="alerts">🆘 {_safe(T["no_alert"])}</p>\n')
+
+        reg_blocks, tg_regions = [], []
+        for reg in doc["regions"]:
+            rvals = {"tmax": deg(reg["tmax"]), "tmin": deg(reg["tmin"]), "pr": mm(reg["pr"])}
+            stats = T["region_stats"].format(**rvals)
+            if reg["wind"] is not None:
+                stats += "  |  " + (T["wind_calm"] if reg["wind"] < 35 else T["wind_gusts"].format(v=reg["wind"]))
+            lines = [T["region_city"].format(city=c["city"], tmax=deg(c["tmax"]), tmin=deg(c["tmin"]), pr=mm(c["pr"]))
+                     for c in reg["cities"][:8]]
+            reg_blocks.append(f"**{reg['name']}** — {stats}\n" + "\n".join(f"- {x}" for x in lines) + "\n")
+            tg_regions.append(f"— {reg['name']}: {rvals['tmax']}/{rvals['tmin']}, {rvals['pr']}")
+            parts_html += [f"<section>\n<h3>{_safe(reg['name'])}</h3>\n<p>{_safe(stats)}</p>\n",
+                           _ul_html(lines) if lines else "", "</section>\n"]
+
+        body = f"{summary_head}\n\n" + "\n".join(f"- {x}" for x in summary) + "\n\n" + alerts_md + "\n".join(reg_blocks)
+        md = f"# {title}\n\n**{T['lead_label']}:** {lead}\n\n{body}\n{T['sources']}\n"
+        # a korábbi kimenettel egyezően: cím + a teljes markdown
+        txt = f"{title}\n\n{md}"
+
+        tg += "\n".join(tg_regions[:8])
+        tg += f"\n\n🆘 {T['tg_alert_national'] if alerts else T['tg_no_alert_national']}\n{T['tg_sources_national']}"
+
+    parts_html += [f'<p class="sources">{_safe(T["sources"])}</p>\n', "</article>\n"]
+    return {
+        "title": title,
+        "lead": lead,
+        "body": body,
+        "md": md,
+        "txt": txt,
+        "telegram": tg[:TELEGRAM_MAX],
+        "html": "".join(parts_html),
+    }
+
+def render_all(doc: dict, langs: tuple[str, ...] = LANGS) -> dict[str, dict[str, str]]:
+    """Minden kért nyelv minden formátuma ugyanabból a dokumentumból: {nyelv: render(doc, nyelv)}."""
+    return {lang: render(doc, lang) for lang in langs}
+
+# ----- régi belépési pontok (magyar kimenet) -----
 
 def make_national_article(target: date,
                           country_daily: dict,
                           regions_rows: list[tuple[str, dict]],
                           alerts: list[str] | None) -> str:
-    tmax = country_daily["tmax_c"]; tmin = country_daily["tmin_c"]; pr = country_daily["precip_mm"]
-    wind = country_daily.get("wind_kmh")
-    title = make_national_title(target)
-    lead  = f"{_emoji_rain(pr)} Napközben országosan átlagosan {_deg(tmax)}, hajnalban {_deg(tmin)}. A csapadék összességében {_mm(pr)} körül alakulhat."
-
-    summary = (
-        "Országos összefoglaló:\n\n"
-        f"- Átlagos csúcs: {_deg(tmax)}\n"
-        f"- Átlagos minimum: {_deg(tmin)}\n"
-        f"- Csapadék (maximum): {_mm(pr)}\n"
-        f"{_maybe_wind_line(wind)}"
-    ).rstrip() + "\n\n"
-
-    reg_blocks = []
-    for reg_name, reg in regions_rows:
-        rtmax = reg["tmax_c"]; rtmin = reg["tmin_c"]; rpr = reg["precip_mm"]; rwind = reg.get("wind_kmh")
-        head = f"**{reg_name}** — csúcs: {_deg(rtmax)}, min: {_deg(rtmin)}, csapadék (max): {_mm(rpr)}"
-        mw = _maybe_wind_line(rwind).strip()
-        if mw:
-            head += f"  |  {mw}"
-        city_lines = []
-        for c in reg.get("cities", [])[:8]:
-            city_lines.append(f"- {c['city']}: {_deg(c['tmax'])}/{_deg(c['tmin'])}, eső {_mm(c['pr'])}")
-        reg_blocks.append(head + "\n" + ("\n".join(city_lines) if city_lines else "") + "\n")
-
-    content = f"# {title}\n\n**Líd:** {lead}\n\n" + summary + _alerts_block(alerts) + "\n".join(reg_blocks) + \
-              "\nForrások: Open-Meteo, OpenWeather (One Call 3.0)\n"
-    return content
+    return render(national_doc(target, country_daily, regions_rows, alerts))["md"]
 
 def make_telegram_national(target: date, country_daily: dict, regions_rows: list[tuple[str, dict]], alerts: list[str] | None) -> str:
-    tmax = country_daily["tmax_c"]; tmin = country_daily["tmin_c"]; pr = country_daily["precip_mm"]
-    wind = country_daily.get("wind_kmh")
-    header = f"🌦️ Országos előrejelzés – {_dow_and_date(target)}\n"
-    summary = (
-        f"• Átlag csúcs: {_deg(tmax)} | min: {_deg(tmin)}\n"
-        f"• Csapadék (max): {_mm(pr)}\n"
-    )
-    if wind is not None:
-        summary += ("• Szél: jelentős nem várható\n" if float(wind) < 35 else f"• Szél: max ~{round(float(wind))} km/h\n")
-
-    reg_lines = []
-    for reg_name, reg in regions_rows:
-        reg_lines.append(f"— {reg_name}: {_deg(reg['tmax_c'])}/{_deg(reg['tmin_c'])}, {_mm(reg['precip_mm'])}")
-
-    alert_line = "🆘 Nincs érvényes riasztás." if not (alerts and any(a.strip() for a in alerts)) else "🆘 Van érvényben riasztás (részletek a weben)."
-    msg = f"{header}{summary}\n" + "\n".join(reg_lines[:8]) + f"\n\n{alert_line}\nForrás: Open-Meteo, OpenWeather"
-    return msg[:3800]
-
-# ----- megyei (Telegram + MD) -----
+    return render(national_doc(target, country_daily, regions_rows, alerts))["telegram"]
 
 def make_telegram(megye: str,
                   per_city_rows: list[dict],
@@ -134,46 +383,7 @@ def make_telegram(megye: str,
     """
     Ha 'target' meg van adva, a fejlécben megjelenik a nap neve + dátum is.
     """
-    tmax = float(daily["tmax_c"])
-    tmin = float(daily["tmin_c"])
-    pr   = float(daily["precip_mm"])
-    wind = daily.get("wind_kmh")  # opcionális
-
-    header = f"🌦️ Milyen idő lesz holnap {megye} vármegyében?"
-    if target:
-        header += f" – {_dow_and_date(target)}"
-    header += "\n"
-
-    summary = f"• Átlag csúcs: {_deg(tmax)}  |  min: {_deg(tmin)}\n• Csapadék (max): {_mm(pr)}\n"
-    if wind is not None:
-        summary += "• Szél: jelentős nem várható\n" if float(wind) < 35 else f"• Szél: max ~{round(float(wind))} km/h\n"
-
-    city_lines = []
-    for r in per_city_rows:
-        # _deg() már tartalmazza a "°C"-t, ezért NEM teszünk mögé még egyet
-        city_lines.append(f"🏙️ {r['city']}: {_deg(r['cons_tmax'])}/{_deg(r['cons_tmin'])}, eső {_mm(r['cons_pr'])}")
-
-    alert_line = "🆘 Nincs holnapi riasztás." if not (alerts and any(a.strip() for a in alerts)) else "🆘 Van érvényben riasztás."
-    footer = "Források: Open-Meteo, OpenWeather (One Call 3.0)"
-
-    msg = f"{header}{summary}\n" + "\n".join(city_lines) + f"\n\n{alert_line}\n{footer}"
-    return msg[:3800]
+    return render(county_doc(megye, per_city_rows, daily, alerts, target=target))["telegram"]
 
 def make_article(megye: str, per_city_rows: list[dict], daily: dict, alerts: list[str] | None = None) -> str:
-    tmax = daily["tmax_c"]; tmin = daily["tmin_c"]; pr = daily["precip_mm"]
-    wind = daily.get("wind_kmh")
-    parts = []
-    parts.append("Megyei összefoglaló:\n\n")
-    parts.append(f"- Átlagos csúcs: {_deg(tmax)}\n")
-    parts.append(f"- Átlagos minimum: {_deg(tmin)}\n")
-    parts.append(f"- Csapadék (maximum): {_mm(pr)}\n")
-    wl = _maybe_wind_line(wind).strip()
-    if wl:
-        parts.append(f"- {wl}\n")
-    parts.append("\n")
-    parts.append("🆘 " + ("Jelenleg nincs érvényben riasztás a holnapi napra.\n\n" if not (alerts and any(a.strip() for a in alerts)) else "Van érvényben riasztás.\n\n"))
-    parts.append(f"{megye} kiemelt települései holnapi várható időjárása:\n\n")
-    for r in per_city_rows:
-        parts.append(f"- {r['city']}: maximum/minimum {_deg(r['cons_tmax'])} / {_deg(r['cons_tmin'])}, eső {_mm(r['cons_pr'])}\n")
-    parts.append("\nForrások: Open-Meteo, OpenWeather (One Call 3.0)\n")
-    return "".join(parts)
+    return render(county_doc(megye, per_city_rows, daily, alerts))["body"]